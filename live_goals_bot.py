@@ -8,19 +8,53 @@ Traccia partite in stato 1-0/0-1 e notifica quando diventano 1-1 entro 10 minuti
 import time
 import sys
 import json
-import tempfile
 from io import BytesIO
 import os
 import re
+import atexit
+import hashlib
+import queue
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dataclasses import dataclass, asdict, fields
+from datetime import date, datetime
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
+from typing import NamedTuple
 from telegram import Bot
 from telegram.ext import Updater, CommandHandler, MessageHandler, Filters
 from telegram.error import Conflict, NetworkError
-from threading import Thread, Lock
+from telegram.utils.request import Request as TelegramRequest
+from threading import Thread, Lock, Event
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from http.server import HTTPServer, BaseHTTPRequestHandler
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Parser JSON per le risposte API: orjson se disponibile (più veloce, lavora direttamente sui bytes)
+_json_loads = orjson.loads if orjson else json.loads
+
+
+def _decode_json(raw):
+    """
+    Decodifica JSON (bytes o str) con _json_loads. Se orjson rifiuta il testo (es. NaN/Infinity)
+    riprova con json.loads, che lo accetta; solleva l'eccezione se nessuno dei due riesce.
+    """
+    try:
+        return _json_loads(raw)
+    except Exception:
+        if _json_loads is json.loads:
+            raise
+        return json.loads(raw)
+
 # ---------- CONFIGURAZIONE ----------
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 CHAT_ID = int(os.getenv("CHAT_ID"))
@@ -28,9 +62,53 @@ POLL_INTERVAL = 30  # Intervallo di controllo in secondi
 SOFASCORE_API_URL = "https://api.sofascore.com/api/v1"
 # Proxy opzionale per SofaScore (es. Cloudflare Workers). Se settato, sostituisce la base URL.
 SOFASCORE_PROXY_BASE = os.getenv("SOFASCORE_PROXY_BASE", SOFASCORE_API_URL)
+# Giorni per cui le partite notificate restano in memoria/su file (storico di /interested e /excel)
+SENT_RETENTION_DAYS = int(os.getenv("SENT_RETENTION_DAYS", "30"))
+# Livello di log (DEBUG per vedere i dettagli delle chiamate API)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Stati SofaScore (minuscoli) di una partita conclusa
+FINISHED_STATUSES = frozenset({"finished", "after overtime", "after penalty", "afterpenalties", "after overtime and penalties"})
+# Emoji per attendibilità (indice 0-5)
+RELIABILITY_EMOJI = ("❌", "⚠️", "⚠️", "✅", "✅", "✅✅")
+# Punteggi mostrati da /live (partite che possono ancora produrre o hanno appena prodotto l'1-1)
+RELEVANT_SCORES = frozenset({(1, 0), (0, 1), (1, 1)})
+# Minuto nella descrizione di stato (es. "1st half 23'"), compilato una volta sola
+_MINUTE_RE = re.compile(r'(\d+)\s*[\'"]')
+
+# Bot Telegram, condiviso tra loop di polling e Updater dei comandi
+TELEGRAM_WORKERS = 4  # Thread dell'Updater per gli handler run_async
+# Pool di connessioni: workers + 4 è il minimo richiesto dai thread dell'Updater,
+# +1 riservata alle notifiche inviate dal loop di polling con lo stesso Bot.
+# Timeout espliciti così un'API Telegram lenta non blocca a lungo il ciclo di controllo
+bot = Bot(
+    token=TELEGRAM_TOKEN,
+    request=TelegramRequest(con_pool_size=TELEGRAM_WORKERS + 5, connect_timeout=5.0, read_timeout=10.0),
+)
+
+# ---------- LOGGING ----------
+log = logging.getLogger("live_goals")
+
+
+def setup_logging():
+    """
+    Configura il logger del bot: i record vengono messi in coda e scritti
+    su stdout da un thread dedicato, così il loop di polling non si blocca sull'I/O.
+    """
+    formatter = logging.Formatter("[%(asctime)s.%(msecs)03dZ] %(message)s", datefmt="%Y-%m-%dT%H:%M:%S")
+    formatter.converter = time.gmtime  # Timestamp in UTC
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, stream_handler)
+    log.addHandler(QueueHandler(log_queue))
+    log.setLevel(LOG_LEVEL)
+    log.propagate = False  # Non duplicare sul root logger (usato da python-telegram-bot)
+    listener.start()
+    atexit.register(listener.stop)
 
-# Bot Telegram
-bot = Bot(token=TELEGRAM_TOKEN)
+
+setup_logging()
 
 # File per salvare le partite attive in tracking
 ACTIVE_MATCHES_FILE = "active_matches.json"
@@ -38,89 +116,294 @@ ACTIVE_MATCHES_FILE = "active_matches.json"
 SENT_MATCHES_FILE = "sent_matches.json"
 # File per salvare la deadlist (partite da non controllare)
 DEADLIST_FILE = "deadlist.json"
+# File per salvare i risultati definitivi delle partite finite (cache persistente)
+FINISHED_RESULTS_FILE = "finished_results.json"
 
 # ---------- RATE LIMITING GLOBALE ----------
 _last_api_call_time = 0
 _rate_limit_lock = Lock()
 MIN_DELAY_BETWEEN_API_CALLS = 0.2  # Secondi minimi tra chiamate API (evita rate limiting, ma non troppo aggressivo)
 
+# ---------- SESSIONE HTTP ----------
+# Sessione condivisa per SofaScore e r.jina.ai: riusa le connessioni TCP/TLS (keep-alive)
+# invece di aprirne una nuova per ogni chiamata
+_http = requests.Session()
+# Pool di thread per le chiamate API indipendenti (es. endpoint live alternativi)
+MAX_PARALLEL_REQUESTS = 8
+# Pool di connessioni abbastanza grande per tutti i thread paralleli; retry leggeri
+# solo sulle risposte 502/503/504 delle GET (403/429 sono gestiti in _fetch_sofascore_json).
+# Nessun retry su errori di connessione/timeout e Retry-After ignorato: una chiamata lenta
+# non deve moltiplicare il proprio timeout e bloccare il ciclo di polling
+_http.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=max(32, MAX_PARALLEL_REQUESTS),
+    max_retries=Retry(
+        total=2,
+        connect=0,
+        read=0,
+        status=2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        backoff_factor=0.3,
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    ),
+))
+_http_executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_REQUESTS, thread_name_prefix="sofascore")
+# Endpoint live che ha restituito eventi nell'ultimo ciclo (provato per primo)
+_preferred_live_endpoint = None
+# Validatori delle risposte live: url -> (ETag, Last-Modified, hash del body, dati decodificati).
+# Con If-None-Match/If-Modified-Since un 304 riusa i dati senza scaricare né decodificare il body;
+# se il server non li supporta, un body con lo stesso hash evita comunque la decodifica
+_conditional_cache = {}
+_conditional_cache_lock = Lock()
+
+# ---------- CACHE RISPOSTE EVENTI ----------
+# Cache in memoria delle risposte /event/{id} e /event/{id}/incidents: url -> (timestamp, dati)
+EVENT_CACHE_TTL = 900  # Secondi
+EVENT_CACHE_MAX_SIZE = 4096
+_event_cache = {}
+_event_cache_lock = Lock()
+# Risultati definitivi delle partite finite: event_id (str) -> [result_1H, result_2H]
+_finished_results = {}
+
+# ---------- CACHE SCRAPING LIVE ----------
+# Ultimo risultato di scrape_sofascore condiviso tra loop di polling e comandi Telegram:
+# tupla (timestamp monotonic, partite, indice match_id -> partita) sostituita in blocco,
+# così i comandi la leggono senza lock
+SCRAPE_CACHE_TTL = 10  # Secondi
+SCRAPE_POLL_MAX_AGE = 5  # Età massima di uno snapshot riusabile dal loop di polling
+_scrape_snapshot = (0.0, None, None)
+_scrape_lock = Lock()  # Serializza gli scraping (mai tenuto dai lettori)
+_scrape_refresh_requested = Event()
+
+
+# ---------- PARTITE LIVE ----------
+class LiveMatch(NamedTuple):
+    """Partita live estratta da SofaScore in scrape_sofascore"""
+    match_id: str
+    home: str
+    away: str
+    score_home: int
+    score_away: int
+    league: str
+    country: str
+    minute: int | None
+    period: int | None  # 1 = primo tempo, 2 = secondo tempo
+    reliability: int  # Attendibilità 0-5
+    event_id: int | None  # ID partita per recuperare eventi/gol
+    status_code: int | None
+    status_type: str  # Già in minuscolo
+    status_description: str
+    result_1h: str | None  # Risultato 1H se disponibile dalla prima chiamata
+    result_2h: str | None  # Risultato 2H se disponibile dalla prima chiamata
+
+
+# ---------- PARTITE IN TRACKING ----------
+@dataclass(slots=True)
+class ActiveMatch:
+    """Partita in tracking: 0-0 in attesa del primo gol, oppure 1-0/0-1 con i dati del primo gol"""
+    home: str
+    away: str
+    league: str
+    country: str = "Unknown"
+    score: str = ""  # "0-0" finché la partita non sblocca il punteggio
+    last_minute: int = 0
+    last_period: int | None = None
+    first_goal_time_ts: float | None = None  # Epoch del primo gol (aritmetica float, niente datetime)
+    first_score: str = ""  # "1-0" o "0-1" dopo il primo gol
+    first_goal_minute: int = 0
+    first_goal_period: int | None = None  # 1 = primo tempo, 2 = secondo tempo
+    first_goal_reliability: int = 0
+
+    def to_dict(self):
+        """Dizionario serializzabile in JSON"""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Ricostruisce la partita da un dizionario salvato (ignora chiavi sconosciute)"""
+        values = {name: data[name] for name in _ACTIVE_MATCH_FIELDS if name in data}
+        first_goal_time = data.get("first_goal_time")
+        if not values.get("first_goal_time_ts") and isinstance(first_goal_time, str):
+            # File salvati con il vecchio campo ISO first_goal_time
+            try:
+                values["first_goal_time_ts"] = datetime.fromisoformat(first_goal_time).timestamp()
+            except ValueError:
+                # Se la conversione fallisce, ignora il timestamp
+                pass
+        return cls(**values)
+
+
+_ACTIVE_MATCH_FIELDS = tuple(f.name for f in fields(ActiveMatch))
+
 
 # ---------- FUNZIONI UTILI ----------
+# Hash dell'ultimo contenuto scritto per ogni file di stato (evita riscritture identiche)
+_last_saved_hash = {}
+# Serializza le scritture dei file di stato (gli handler run_async girano su altri thread)
+_state_write_lock = Lock()
+
+
+def _write_json_file(path, obj):
+    """
+    Scrive obj come JSON su path in modo atomico (file temporaneo + fsync + os.replace),
+    sotto lock così due thread non si contendono lo stesso .tmp.
+    Se il contenuto è identico all'ultimo salvataggio, la scrittura viene saltata.
+    """
+    if orjson:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    else:
+        # Stessi byte di orjson (UTF-8, niente escape \uXXXX): l'hash resta confrontabile
+        data = json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    digest = hashlib.blake2b(data, digest_size=16).digest()
+    with _state_write_lock:
+        if _last_saved_hash.get(path) == digest:
+            return
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        _last_saved_hash[path] = digest
+
+
+def _read_json_file(path):
+    """
+    Legge un file di stato JSON come bytes UTF-8 (indipendente dal locale).
+    Torna None se il file non esiste o non è leggibile; gli errori vengono loggati,
+    perché uno stato perso in silenzio porterebbe a notifiche duplicate.
+    """
+    try:
+        with open(path, "rb") as f:
+            return _json_loads(f.read())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log.error("❌ Impossibile leggere %s: %s", path, e)
+        return None
+
+
 def load_active_matches():
     """Carica le partite attive in tracking (0-0 o 1-0/0-1) da file"""
+    data = _read_json_file(ACTIVE_MATCHES_FILE)
+    if not isinstance(data, dict):
+        return {}
     try:
-        with open(ACTIVE_MATCHES_FILE, "r") as f:
-            data = json.load(f)
-            # Converti timestamp string in datetime (solo se esiste)
-            for match_id, match_data in data.items():
-                if "first_goal_time" in match_data:
-                    try:
-                        match_data["first_goal_time"] = datetime.fromisoformat(match_data["first_goal_time"])
-                    except:
-                        # Se la conversione fallisce, rimuovi la chiave
-                        del match_data["first_goal_time"]
-            return data
-    except Exception:
+        return {match_id: ActiveMatch.from_dict(match_data) for match_id, match_data in data.items()}
+    except Exception as e:
+        log.error("❌ Partite attive non valide in %s: %s", ACTIVE_MATCHES_FILE, e)
         return {}
 
 
 def save_active_matches(active_matches):
     """Salva le partite attive in tracking su file"""
-    # Converti datetime in string per JSON (solo se esiste)
-    data = {}
-    for match_id, match_data in active_matches.items():
-        data[match_id] = match_data.copy()
-        if "first_goal_time" in match_data and match_data["first_goal_time"]:
-            # Converti datetime in string solo se esiste
-            if isinstance(match_data["first_goal_time"], datetime):
-                data[match_id]["first_goal_time"] = match_data["first_goal_time"].isoformat()
-            # Se è già una stringa, lasciala così
-        # Se non esiste (partite 0-0), non aggiungere la chiave
-    
-    with open(ACTIVE_MATCHES_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+    data = {match_id: match_data.to_dict() for match_id, match_data in active_matches.items()}
+    _write_json_file(ACTIVE_MATCHES_FILE, data)
 
 
 def load_sent_matches():
     """Carica le partite già notificate da file"""
-    try:
-        with open(SENT_MATCHES_FILE, "r") as f:
-            data = json.load(f)
-            # Se è una lista (vecchio formato), converti in dict
-            if isinstance(data, list):
-                return {match_id: {} for match_id in data}
-            return data
-    except Exception:
-        return {}
+    data = _read_json_file(SENT_MATCHES_FILE)
+    # Se è una lista (vecchio formato), converti in dict
+    if isinstance(data, list):
+        return {match_id: {} for match_id in data}
+    return data if isinstance(data, dict) else {}
 
 
 def save_sent_matches(sent_dict):
     """Salva le partite già notificate su file"""
-    with open(SENT_MATCHES_FILE, "w") as f:
-        json.dump(sent_dict, f, indent=2)
+    _write_json_file(SENT_MATCHES_FILE, sent_dict)
 
 
 def load_deadlist():
     """Carica la deadlist (partite da non controllare) da file"""
-    try:
-        with open(DEADLIST_FILE, "r") as f:
-            data = json.load(f)
-            # Se è una lista (vecchio formato), converti in set
-            if isinstance(data, list):
-                return set(data)
-            # Se è un dict, usa le chiavi come set
-            if isinstance(data, dict):
-                return set(data.keys())
-            return set(data) if data else set()
-    except Exception:
-        return set()
+    data = _read_json_file(DEADLIST_FILE)
+    # Se è una lista (vecchio formato), converti in set
+    if isinstance(data, list):
+        return set(data)
+    # Se è un dict, usa le chiavi come set
+    if isinstance(data, dict):
+        return set(data.keys())
+    return set()
 
 
 def save_deadlist(deadlist):
     """Salva la deadlist su file"""
-    # Salva come lista per semplicità
-    with open(DEADLIST_FILE, "w") as f:
-        json.dump(list(deadlist), f, indent=2)
+    # Salva come lista ordinata (stesso contenuto -> stesso file)
+    _write_json_file(DEADLIST_FILE, sorted(deadlist))
+
+
+class StateBatch:
+    """
+    Raccoglie le modifiche allo stato (partite attive, notificate, deadlist) durante
+    un ciclo di polling e le salva su file una sola volta all'uscita del blocco `with`.
+    Vengono riscritti solo i file delle strutture effettivamente modificate.
+    """
+    
+    def __init__(self, active_matches, sent_matches, deadlist):
+        self.active_matches = active_matches
+        self.sent_matches = sent_matches
+        self.deadlist = deadlist
+        self.dirty_active = set()
+        self.dirty_sent = set()
+        self.dirty_deadlist = set()
+        # Notifiche 1-1 da inviare a fine ciclo: (match_id, ActiveMatch, argomenti di format_notification)
+        self.notifications = []
+    
+    def add_to_deadlist(self, match_id):
+        """Aggiunge una partita alla deadlist, marcandola come modificata solo se nuova"""
+        if match_id not in self.deadlist:
+            self.deadlist.add(match_id)
+            self.dirty_deadlist.add(match_id)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Salva anche se il ciclo è fallito: lo stato in memoria resta quello valido
+        # (es. una notifica già inviata non deve ripartire dopo un riavvio)
+        if self.dirty_active:
+            save_active_matches(self.active_matches)
+        if self.dirty_sent:
+            save_sent_matches(self.sent_matches)
+        if self.dirty_deadlist:
+            save_deadlist(self.deadlist)
+        return False
+
+
+# Stato del bot in memoria: caricato una volta in main(), modificato solo dal loop di polling
+# e salvato su file a fine ciclo (solo le strutture cambiate) e all'uscita del processo.
+# I comandi leggono una copia (dict(...)) per non iterare mentre il loop le modifica.
+_active_matches = {}
+_sent_matches = {}
+_deadlist = set()
+
+
+def load_state():
+    """Carica da file partite attive, notificate e deadlist nello stato in memoria"""
+    _active_matches.update(load_active_matches())
+    _sent_matches.update(load_sent_matches())
+    _deadlist.update(load_deadlist())
+
+
+def save_state():
+    """Salva su file tutto lo stato in memoria (usata all'uscita del processo)"""
+    save_active_matches(_active_matches)
+    save_sent_matches(_sent_matches)
+    save_deadlist(_deadlist)
+
+
+def load_finished_results():
+    """Carica i risultati definitivi delle partite finite da file"""
+    data = _read_json_file(FINISHED_RESULTS_FILE)
+    return data if isinstance(data, dict) else {}
+
+
+def save_finished_results(finished_results):
+    """Salva i risultati definitivi delle partite finite su file"""
+    _write_json_file(FINISHED_RESULTS_FILE, finished_results)
 
 
 def should_be_deadlisted(match, sent_matches, active_matches):
@@ -133,18 +416,18 @@ def should_be_deadlisted(match, sent_matches, active_matches):
     3. È finita
     4. Era 1-0/0-1 ma è scaduta (>10 minuti dal primo gol)
     """
-    match_id = get_match_id(match["home"], match["away"], match["league"])
-    score_home = match["score_home"]
-    score_away = match["score_away"]
-    status_type = (match.get("status_type") or "").lower()
-    minute = match.get("minute")
+    match_id = match.match_id
+    score_home = match.score_home
+    score_away = match.score_away
+    status_type = match.status_type or ""
+    minute = match.minute
     
     # 1. Già notificata
     if match_id in sent_matches:
         return True, "già notificata"
     
     # 2. Finita
-    if status_type in ("finished", "after overtime", "after penalty", "afterpenalties", "after overtime and penalties"):
+    if status_type in FINISHED_STATUSES:
         return True, "finita"
     
     # 3. Punteggio che non può diventare 1-1
@@ -159,8 +442,8 @@ def should_be_deadlisted(match, sent_matches, active_matches):
     # 4. Era 1-0/0-1 ma è scaduta (>10 minuti dal primo gol)
     if match_id in active_matches:
         match_data = active_matches[match_id]
-        if "first_score" in match_data:  # Era 1-0/0-1
-            first_goal_minute = match_data.get("first_goal_minute", 0)
+        if match_data.first_score:  # Era 1-0/0-1
+            first_goal_minute = match_data.first_goal_minute
             if first_goal_minute > 0 and minute is not None and minute > 0:
                 elapsed = minute - first_goal_minute
                 if elapsed > 10:
@@ -169,8 +452,9 @@ def should_be_deadlisted(match, sent_matches, active_matches):
     return False, None
 
 
+@lru_cache(maxsize=8192)
 def get_match_id(home, away, league):
-    """Genera un ID univoco per una partita"""
+    """Genera un ID univoco per una partita (memoizzato: le stesse partite ricorrono ogni ciclo)"""
     return f"{home}_{away}_{league}".lower().replace(" ", "_")
 
 
@@ -186,28 +470,49 @@ def _wait_for_rate_limit():
         _last_api_call_time = time.time()
 
 
-def _fetch_sofascore_json(url, headers, max_retries=2):
+def _fetch_sofascore_json(url, headers, max_retries=2, conditional=False):
     """
     Tenta fetch diretto; su 403 usa fallback r.jina.ai come proxy pubblico.
     Con retry e exponential backoff per errori 429.
+    Con conditional=True usa una GET condizionale (ETag/Last-Modified) e riusa l'ultima risposta
+    su 304 o se il body è identico.
     """
-    now_utc = datetime.utcnow().isoformat() + "Z"
-    
     # Rate limiting: attendi prima di fare la chiamata
     _wait_for_rate_limit()
     
     try:
-        resp = requests.get(url, headers=headers, timeout=15)
+        cached = None
+        if conditional:
+            with _conditional_cache_lock:
+                cached = _conditional_cache.get(url)
+            if cached:
+                headers = dict(headers)
+                if cached[0]:
+                    headers["If-None-Match"] = cached[0]
+                if cached[1]:
+                    headers["If-Modified-Since"] = cached[1]
+        resp = _http.get(url, headers=headers, timeout=15)
+        if resp.status_code == 304 and cached:
+            log.debug("♻️ Risposta invariata (304): %s", url)
+            return cached[3]
         if resp.status_code == 200:
             try:
-                return resp.json()
+                if not conditional:
+                    return _decode_json(resp.content)
+                digest = hashlib.blake2b(resp.content, digest_size=16).digest()
+                if cached and cached[2] == digest:
+                    log.debug("♻️ Risposta invariata (stesso body): %s", url)
+                    data = cached[3]
+                else:
+                    data = _decode_json(resp.content)
+                with _conditional_cache_lock:
+                    _conditional_cache[url] = (resp.headers.get("ETag"), resp.headers.get("Last-Modified"), digest, data)
+                return data
             except Exception:
-                print(f"[{now_utc}] ⚠️ JSON non valido dalla API diretta, lunghezza body={len(resp.text)}")
-                sys.stdout.flush()
+                log.warning("⚠️ JSON non valido dalla API diretta, lunghezza body=%d", len(resp.text))
                 return None
         if resp.status_code != 403:
-            print(f"[{now_utc}] ⚠️ Errore API SofaScore: status={resp.status_code}")
-            sys.stdout.flush()
+            log.warning("⚠️ Errore API SofaScore: status=%s", resp.status_code)
             return None
         
         # Fallback via r.jina.ai (no crediti, spesso evita blocchi IP)
@@ -220,18 +525,15 @@ def _fetch_sofascore_json(url, headers, max_retries=2):
             if attempt > 0:
                 # Exponential backoff: 1s, 2s, 4s...
                 backoff_time = 2 ** (attempt - 1)
-                now_utc = datetime.utcnow().isoformat() + "Z"
-                print(f"[{now_utc}] ⏳ Retry {attempt}/{max_retries} dopo {backoff_time}s...")
-                sys.stdout.flush()
+                log.info("⏳ Retry %d/%d dopo %ds...", attempt, max_retries, backoff_time)
                 time.sleep(backoff_time)
             
             _wait_for_rate_limit()  # Rate limiting anche per retry
             
             if attempt == 0:
-                print(f"[{now_utc}] 🔁 Fallback via r.jina.ai: {proxy_url}")
-                sys.stdout.flush()
+                log.info("🔁 Fallback via r.jina.ai: %s", proxy_url)
             
-            prox_resp = requests.get(
+            prox_resp = _http.get(
                 proxy_url,
                 headers={
                     "User-Agent": headers.get("User-Agent", "Mozilla/5.0"),
@@ -242,8 +544,7 @@ def _fetch_sofascore_json(url, headers, max_retries=2):
             
             if prox_resp.status_code == 200:
                 try:
-                    import json as _json
-                    wrapper = prox_resp.json()
+                    wrapper = _decode_json(prox_resp.content)
                     # r.jina.ai restituisce un wrapper con data.content come stringa JSON
                     if isinstance(wrapper, dict) and "data" in wrapper:
                         data_obj = wrapper.get("data", {})
@@ -252,46 +553,104 @@ def _fetch_sofascore_json(url, headers, max_retries=2):
                             if isinstance(content_str, str) and content_str.strip().startswith("{"):
                                 # Parse il JSON annidato
                                 try:
-                                    return _json.loads(content_str)
+                                    return _decode_json(content_str)
                                 except Exception as e:
-                                    print(f"[{now_utc}] ⚠️ Errore parse JSON annidato da r.jina.ai: {e}")
-                                    sys.stdout.flush()
+                                    log.warning("⚠️ Errore parse JSON annidato da r.jina.ai: %s", e)
                     # Se non è il formato r.jina.ai, restituisci direttamente
                     return wrapper
                 except Exception:
-                    # Alcuni proxy restituiscono testo JSON valido: prova json.loads
-                    import json as _json
-                    try:
-                        return _json.loads(prox_resp.text)
-                    except Exception:
-                        print(f"[{now_utc}] ⚠️ Impossibile parsare JSON dal fallback, primi 200 char: {prox_resp.text[:200]!r}")
-                        sys.stdout.flush()
-                        return None
+                    log.warning("⚠️ Impossibile parsare JSON dal fallback, primi 200 char: %r", prox_resp.text[:200])
+                    return None
             elif prox_resp.status_code == 429:
                 # Rate limited - continuerà con il retry
-                now_utc = datetime.utcnow().isoformat() + "Z"
-                print(f"[{now_utc}] ⚠️ Rate limited (429) da r.jina.ai, tentativo {attempt + 1}/{max_retries + 1}")
-                sys.stdout.flush()
+                log.warning("⚠️ Rate limited (429) da r.jina.ai, tentativo %d/%d", attempt + 1, max_retries + 1)
                 if attempt < max_retries:
                     continue  # Prova di nuovo
                 else:
-                    print(f"[{now_utc}] ⚠️ Fallback r.jina.ai fallito dopo {max_retries + 1} tentativi: status=429")
-                    sys.stdout.flush()
+                    log.warning("⚠️ Fallback r.jina.ai fallito dopo %d tentativi: status=429", max_retries + 1)
                     return None
             else:
                 # Altro errore
-                now_utc = datetime.utcnow().isoformat() + "Z"
-                print(f"[{now_utc}] ⚠️ Fallback r.jina.ai fallito: status={prox_resp.status_code}")
-                sys.stdout.flush()
+                log.warning("⚠️ Fallback r.jina.ai fallito: status=%s", prox_resp.status_code)
                 return None
         
         return None
     except Exception as e:
-        print(f"[{now_utc}] ⚠️ Eccezione fetch SofaScore: {e}")
-        sys.stdout.flush()
+        log.warning("⚠️ Eccezione fetch SofaScore: %s", e)
         return None
 
 
+def _score_value(score_obj):
+    """Estrae il valore numerico di un punteggio SofaScore (oggetto con 'current'/'display' o numero)"""
+    # I dict del JSON sono sempre dict "puri": type() è più veloce di isinstance()
+    if type(score_obj) is dict:
+        value = score_obj.get("current")
+        if value is None:
+            value = score_obj.get("display")
+        return value or 0
+    return score_obj or 0
+
+
+def _fetch_event_json(url, headers):
+    """
+    Come _fetch_sofascore_json, ma con cache TTL per gli endpoint di dettaglio evento.
+    Le risposte vuote non vengono salvate in cache.
+    """
+    now = time.monotonic()
+    with _event_cache_lock:
+        cached = _event_cache.get(url)
+        if cached and now - cached[0] < EVENT_CACHE_TTL:
+            return cached[1]
+    
+    data = _fetch_sofascore_json(url, headers)
+    if data:
+        with _event_cache_lock:
+            if len(_event_cache) >= EVENT_CACHE_MAX_SIZE:
+                # Rimuovi le voci scadute; se non basta, svuota la cache
+                expired = [key for key, (ts, _) in _event_cache.items() if now - ts >= EVENT_CACHE_TTL]
+                for key in expired:
+                    del _event_cache[key]
+                if len(_event_cache) >= EVENT_CACHE_MAX_SIZE:
+                    _event_cache.clear()
+            _event_cache[url] = (now, data)
+    return data
+
+
+def _fetch_live_events(url, headers):
+    """Interroga un endpoint live e restituisce la lista di eventi (vuota se non disponibili)"""
+    log.info("Richiesta API SofaScore: %s...", url)
+    data = _fetch_sofascore_json(url, headers, conditional=True)
+    if not data:
+        return []
+    # Normalizza le possibili chiavi
+    events = data.get("events") or data.get("results") or []
+    log.info("✅ Trovate %d partite live dalla API (%s)", len(events), url)
+    if not events:
+        # Log breve del payload per capire il formato
+        try:
+            raw = json.dumps(data)[:200]
+        except Exception:
+            raw = str(data)[:200]
+        log.info("ℹ️ Nessun evento nell'endpoint, anteprima payload: %s", raw)
+    return events
+
+
+def _fetch_first_live_events(endpoints, headers):
+    """
+    Interroga gli endpoint live in parallelo.
+    Torna (eventi, url) del primo endpoint che risponde con eventi, ([], None) se nessuno.
+    """
+    futures = {_http_executor.submit(_fetch_live_events, url, headers): url for url in endpoints}
+    for future in as_completed(futures):
+        events = future.result()
+        if events:
+            # Gli endpoint non ancora partiti non servono più
+            for other in futures:
+                other.cancel()
+            return events, futures[future]
+    return [], None
+
+
 def scrape_sofascore():
     """Ottiene tutte le partite live tramite API SofaScore"""
     try:
@@ -311,83 +670,66 @@ def scrape_sofascore():
             f"{SOFASCORE_PROXY_BASE}/sport/football/livescore",
         ]
         
-        now_utc = datetime.utcnow().isoformat() + "Z"
+        # Prova prima l'endpoint che ha funzionato nell'ultimo ciclo, poi gli altri in parallelo
+        global _preferred_live_endpoint
         events = []
-        for idx, url in enumerate(endpoints, start=1):
-            print(f"[{now_utc}] Richiesta API SofaScore: {url}... (tentativo {idx})")
-            sys.stdout.flush()
-            data = _fetch_sofascore_json(url, headers)
-            if not data:
-                continue
-            # Normalizza le possibili chiavi
-            events = data.get("events") or data.get("results") or []
-            print(f"[{now_utc}] ✅ Trovate {len(events)} partite live dalla API (tentativo {idx})")
-            sys.stdout.flush()
-            if events:
-                break
-            else:
-                # Log breve del payload per capire il formato
-                try:
-                    import json as _json
-                    raw = _json.dumps(data)[:200]
-                except Exception:
-                    raw = str(data)[:200]
-                print(f"[{now_utc}] ℹ️ Nessun evento nell'endpoint, anteprima payload: {raw}")
-                sys.stdout.flush()
+        other_endpoints = endpoints
+        if _preferred_live_endpoint in endpoints:
+            events = _fetch_live_events(_preferred_live_endpoint, headers)
+            other_endpoints = [url for url in endpoints if url != _preferred_live_endpoint]
+        if not events:
+            events, _preferred_live_endpoint = _fetch_first_live_events(other_endpoints, headers)
         
         matches = []
         if not events:
-            print(f"[{now_utc}] ⚠️ Nessun evento trovato su tutti gli endpoint live")
-            sys.stdout.flush()
+            log.warning("⚠️ Nessun evento trovato su tutti gli endpoint live")
             return []
         
+        # Riferimenti locali per il loop sugli eventi (centinaia per ciclo) e un solo istante
+        # di riferimento per il calcolo dei minuti di tutte le partite
+        append_match = matches.append
+        score_value = _score_value
+        now_ts = time.time()
+        
         for event in events:
             try:
+                ev_get = event.get
                 # Estrai informazioni partita
-                tournament = event.get("tournament", {})
+                tournament = ev_get("tournament", {})
                 league = tournament.get("name", "Unknown")
                 country = tournament.get("category", {}).get("name", "Unknown")
                 
-                home_team = event.get("homeTeam", {})
-                away_team = event.get("awayTeam", {})
+                home_team = ev_get("homeTeam", {})
+                away_team = ev_get("awayTeam", {})
                 home = home_team.get("name", "Unknown")
                 away = away_team.get("name", "Unknown")
                 
                 # Estrai punteggio (sono oggetti con 'current' o 'display')
-                score_home_obj = event.get("homeScore", {})
-                score_away_obj = event.get("awayScore", {})
-                
-                # Estrai valore numerico dal punteggio
-                if isinstance(score_home_obj, dict):
-                    score_home = score_home_obj.get("current", score_home_obj.get("display", 0))
-                else:
-                    score_home = score_home_obj if score_home_obj is not None else 0
-                
-                if isinstance(score_away_obj, dict):
-                    score_away = score_away_obj.get("current", score_away_obj.get("display", 0))
-                else:
-                    score_away = score_away_obj if score_away_obj is not None else 0
+                score_home = score_value(ev_get("homeScore"))
+                score_away = score_value(ev_get("awayScore"))
                 
                 # NON filtrare 0-0 - includiamo tutte le partite
                 
+                # Stato partita e metà tempo (1st half o 2nd half), letti una sola volta
+                status = ev_get("status", {})
+                status_code = status.get("code")
+                status_description = status.get("description", "")
+                status_desc = status_description.lower()
+                status_type = (status.get("type") or "").lower()
+                is_first_half = "1st half" in status_desc or status_code == 6
+                is_second_half = "2nd half" in status_desc or status_code == 7
+                
                 # Estrai minuto e calcola attendibilità
-                time_obj = event.get("time", {})
-                status = event.get("status", {})
+                time_obj = ev_get("time", {})
                 minute = None
                 reliability = 0  # Attendibilità 0-5
                 
                 if isinstance(time_obj, dict):
-                    # Determina periodo (1st half o 2nd half)
-                    status_desc = status.get("description", "").lower()
-                    status_code = status.get("code")
-                    is_first_half = "1st half" in status_desc or status_code == 6
-                    is_second_half = "2nd half" in status_desc or status_code == 7
-                    
                     # Calcola minuto corrente basato su currentPeriodStartTimestamp
                     if "currentPeriodStartTimestamp" in time_obj:
                         start_ts = time_obj.get("currentPeriodStartTimestamp")
                         if start_ts:
-                            elapsed_seconds = datetime.now().timestamp() - start_ts
+                            elapsed_seconds = now_ts - start_ts
                             elapsed_minutes = int(elapsed_seconds / 60)
                             
                             if is_second_half:
@@ -405,12 +747,12 @@ def scrape_sofascore():
                     
                     # Se non disponibile, prova a estrarre da status description
                     if minute is None:
-                        desc = status.get("description", "")
+                        desc = status_description
                         if "1st half" in desc or "2nd half" in desc:
                             # Estrai numero se presente nella descrizione (es. "1st half 23'")
-                            match = re.search(r'(\d+)\s*[\'"]', desc)
-                            if match:
-                                extracted_min = int(match.group(1))
+                            minute_match = _MINUTE_RE.search(desc)
+                            if minute_match:
+                                extracted_min = int(minute_match.group(1))
                                 if is_second_half and extracted_min < 45:
                                     # Se è secondo tempo ma il minuto è < 45, aggiungi 45
                                     minute = 45 + extracted_min
@@ -421,17 +763,13 @@ def scrape_sofascore():
                     minute = int(time_obj)
                     reliability = 1  # Minuto diretto ma senza contesto
                 
-                # Estrai stato partita
-                status = event.get("status", {})
-                status_type = status.get("type", "")
                 # NON filtrare partite non iniziate - includiamo tutte le partite
                 
-                # Determina metà tempo (1st half o 2nd half)
+                # Determina metà tempo
                 period = None
-                status_desc = status.get("description", "").lower()
-                if "1st half" in status_desc or status.get("code") == 6:
+                if is_first_half:
                     period = 1  # Primo tempo
-                elif "2nd half" in status_desc or status.get("code") == 7:
+                elif is_second_half:
                     period = 2  # Secondo tempo
                 elif minute is not None:
                     # Determina dalla base del minuto
@@ -441,7 +779,7 @@ def scrape_sofascore():
                         period = 2
                 
                 # Estrai ID partita per recuperare eventi/gol
-                event_id = event.get("id")
+                event_id = ev_get("id")
                 
                 # PROVA: Verifica se l'evento contiene già i risultati per periodo
                 # (potrebbe essere disponibile nella prima chiamata senza bisogno di chiamate aggiuntive)
@@ -449,73 +787,146 @@ def scrape_sofascore():
                 result_2h = None
                 
                 # DEBUG: Log tutte le chiavi disponibili nell'evento (solo per la prima partita)
-                if len(matches) == 0 and event_id:
-                    now_utc = datetime.utcnow().isoformat() + "Z"
-                    event_keys = list(event.keys())
-                    print(f"[{now_utc}] 🔍 DEBUG: Chiavi disponibili nell'evento {event_id}: {event_keys}")
-                    sys.stdout.flush()
+                if len(matches) == 0 and event_id and log.isEnabledFor(logging.DEBUG):
+                    log.debug("🔍 Chiavi disponibili nell'evento %s: %s", event_id, list(event.keys()))
                     # Verifica se c'è un campo periods
                     if "periods" in event:
-                        print(f"[{now_utc}] ✅ DEBUG: Campo 'periods' trovato nell'evento!")
-                        sys.stdout.flush()
+                        log.debug("✅ Campo 'periods' trovato nell'evento!")
                 
                 # Cerca periods nell'evento stesso
-                periods = event.get("periods", [])
+                periods = ev_get("periods", [])
                 if periods:
-                    period_1h = None
-                    period_2h = None
-                    for p in periods:
-                        period_num = p.get("period")
-                        if period_num == 1:
-                            period_1h = p
-                        elif period_num == 2:
-                            period_2h = p
-                    
-                    if period_1h and period_2h:
-                        home_1h = period_1h.get("homeScore", 0)
-                        away_1h = period_1h.get("awayScore", 0)
-                        home_ft = period_2h.get("homeScore", 0)
-                        away_ft = period_2h.get("awayScore", 0)
-                        result_1h = f"{home_1h}-{away_1h}"
-                        result_2h = f"{home_ft}-{away_ft}"
+                    period_results = _results_from_periods({p.get("period"): p for p in periods})
+                    if period_results:
+                        result_1h, result_2h = period_results
                 
-                matches.append({
-                    "home": home,
-                    "away": away,
-                    "score_home": score_home,
-                    "score_away": score_away,
-                    "league": league,
-                    "country": country,
-                    "minute": minute,
-                    "period": period,  # 1 = primo tempo, 2 = secondo tempo
-                    "reliability": reliability,  # Attendibilità 0-5
-                    "event_id": event_id,  # ID partita per recuperare eventi/gol
-                    "status_code": status.get("code"),
-                    "status_type": status.get("type"),
-                    "status_description": status.get("description", ""),
-                    "result_1h": result_1h,  # Risultato 1H se disponibile dalla prima chiamata
-                    "result_2h": result_2h   # Risultato 2H se disponibile dalla prima chiamata
-                })
+                append_match(LiveMatch(
+                    match_id=get_match_id(home, away, league),  # Calcolato una sola volta per partita
+                    home=home,
+                    away=away,
+                    score_home=score_home,
+                    score_away=score_away,
+                    league=league,
+                    country=country,
+                    minute=minute,
+                    period=period,
+                    reliability=reliability,
+                    event_id=event_id,
+                    status_code=status_code,
+                    status_type=status_type,
+                    status_description=status_description,
+                    result_1h=result_1h,
+                    result_2h=result_2h
+                ))
             except Exception as e:
-                print(f"Errore nell'estrazione partita: {e}")
+                log.warning("Errore nell'estrazione partita: %s", e)
                 continue
         
-        print(f"[{now_utc}] ✅ Estratte {len(matches)} partite totali dalla risposta")
-        sys.stdout.flush()
+        log.info("✅ Estratte %d partite totali dalla risposta", len(matches))
         return matches
     
     except requests.exceptions.RequestException as e:
-        now_utc = datetime.utcnow().isoformat() + "Z"
-        print(f"[{now_utc}] Errore nella richiesta API SofaScore: {e}")
-        sys.stdout.flush()
+        log.error("Errore nella richiesta API SofaScore: %s", e)
         return []
     except Exception as e:
-        now_utc = datetime.utcnow().isoformat() + "Z"
-        print(f"[{now_utc}] Errore nello scraping SofaScore: {e}")
-        sys.stdout.flush()
+        log.error("Errore nello scraping SofaScore: %s", e)
         return []
 
 
+def _refresh_scrape(max_age=0.0):
+    """
+    Esegue un nuovo scraping e pubblica lo snapshot aggiornato.
+    Se, acquisito il lock, lo snapshot è più giovane di max_age secondi (un altro thread
+    l'ha appena aggiornato mentre si attendeva) viene restituito quello: le richieste
+    concorrenti producono un solo scraping.
+    """
+    global _scrape_snapshot
+    with _scrape_lock:
+        ts, data, index = _scrape_snapshot
+        if data is not None and time.monotonic() - ts < max_age:
+            return data, index
+        data = scrape_sofascore()
+        index = {m.match_id: m for m in data}
+        _scrape_snapshot = (time.monotonic(), data, index)
+        return data, index
+
+
+def cached_scrape(ttl=SCRAPE_CACHE_TTL, max_age=None):
+    """
+    Restituisce (partite live, indice match_id -> partita) dall'ultimo scraping.
+    Con max_age (usato dal loop di polling) lo snapshot è accettato solo se più giovane
+    di max_age secondi, altrimenti si attende un nuovo scraping.
+    Senza max_age, se lo snapshot è più vecchio di ttl secondi viene comunque restituito subito
+    e l'aggiornamento è delegato al thread in background: i comandi non aspettano la rete.
+    """
+    if max_age is not None:
+        return _refresh_scrape(max_age)
+    ts, data, index = _scrape_snapshot
+    if data is None:
+        # Nessuno scraping ancora disponibile (avvio): bisogna attenderlo
+        return _refresh_scrape(ttl)
+    if time.monotonic() - ts >= ttl:
+        _scrape_refresh_requested.set()
+    return data, index
+
+
+def _scrape_refresh_loop():
+    """Thread in background: aggiorna lo snapshot quando un comando lo trova scaduto"""
+    while True:
+        _scrape_refresh_requested.wait()
+        _scrape_refresh_requested.clear()
+        try:
+            # Se il loop di polling l'ha appena aggiornato, _refresh_scrape non rifà la richiesta
+            _refresh_scrape(SCRAPE_CACHE_TTL)
+        except Exception as e:
+            log.warning("⚠️ Errore aggiornamento scraping in background: %s", e)
+
+
+def _incident_goal(incident):
+    """
+    Normalizza un incident SofaScore di tipo gol.
+    Torna (minute, is_home, is_away) oppure None se non è un gol utilizzabile.
+    """
+    incident_type = incident.get("type", {})
+    type_id = incident_type.get("id") if isinstance(incident_type, dict) else incident_type
+    
+    # Type 100 = goal, 101 = own goal
+    if type_id not in (100, 101):
+        return None
+    minute = incident.get("minute")
+    if minute is None:
+        return None
+    
+    # Estrai informazioni squadra (può essere isHome/isAway o team)
+    is_home = incident.get("isHome")
+    is_away = incident.get("isAway")
+    
+    # Se non trovato con isHome/isAway, prova con team
+    if is_home is None and is_away is None:
+        team = incident.get("team")
+        if isinstance(team, dict):
+            team_id = team.get("id")
+            home_team = incident.get("homeTeam")
+            away_team = incident.get("awayTeam")
+            # Controlla se è la squadra di casa
+            if isinstance(home_team, dict) and team_id == home_team.get("id"):
+                is_home = True
+            elif isinstance(away_team, dict) and team_id == away_team.get("id"):
+                is_away = True
+    
+    # Se non possiamo determinare la squadra, salta questo gol
+    # (potrebbe essere un gol annullato o un errore nei dati)
+    if is_home is None and is_away is None:
+        return None
+    
+    # Normalizza: se uno è True, l'altro deve essere False
+    if is_home is True:
+        return minute, True, False
+    if is_away is True:
+        return minute, False, True
+    return minute, False, False
+
+
 def get_match_goal_minute(event_id, score_home, score_away, headers, goal_number=1):
     """
     Recupera il minuto esatto di un gol dalla partita tramite API SofaScore
@@ -534,8 +945,7 @@ def get_match_goal_minute(event_id, score_home, score_away, headers, goal_number
         # Endpoint per eventi/incidents della partita
         url = f"{SOFASCORE_PROXY_BASE}/event/{event_id}/incidents"
         
-        now_utc = datetime.utcnow().isoformat() + "Z"
-        data = _fetch_sofascore_json(url, headers)
+        data = _fetch_event_json(url, headers)
         
         if not data:
             return None, 0
@@ -546,58 +956,17 @@ def get_match_goal_minute(event_id, score_home, score_away, headers, goal_number
         # Filtra solo i gol (type=100 goal, type=101 own goal)
         goals = []
         for incident in incidents:
-            incident_type = incident.get("type", {})
-            if isinstance(incident_type, dict):
-                type_id = incident_type.get("id")
-            else:
-                type_id = incident_type
-            
-            # Type 100 = goal, 101 = own goal
-            if type_id in [100, 101]:
-                minute = incident.get("minute")
-                if minute is None:
-                    continue
-                
-                # Estrai informazioni squadra (può essere isHome/isAway o team)
-                is_home = incident.get("isHome")
-                is_away = incident.get("isAway")
-                
-                # Se non trovato con isHome/isAway, prova con team
-                if is_home is None and is_away is None:
-                    team = incident.get("team", {})
-                    if isinstance(team, dict):
-                        # Controlla se è la squadra di casa
-                        if team.get("id") == incident.get("homeTeam", {}).get("id") if isinstance(incident.get("homeTeam"), dict) else False:
-                            is_home = True
-                            is_away = False
-                        elif team.get("id") == incident.get("awayTeam", {}).get("id") if isinstance(incident.get("awayTeam"), dict) else False:
-                            is_home = False
-                            is_away = True
-                
-                # Se ancora non abbiamo informazioni sulla squadra, salta
-                if is_home is None and is_away is None:
-                    continue
-                
-                # Normalizza: se uno è True, l'altro deve essere False
-                if is_home is True:
-                    is_away = False
-                elif is_away is True:
-                    is_home = False
-                elif is_home is None:
-                    is_home = False
-                elif is_away is None:
-                    is_away = False
-                
-                goals.append({
-                    "minute": minute,
-                    "is_home": bool(is_home),
-                    "incident": incident
-                })
+            goal = _incident_goal(incident)
+            if goal is None:
+                continue
+            goals.append({
+                "minute": goal[0],
+                "is_home": goal[1],
+                "incident": incident
+            })
         
         if not goals:
-            now_utc = datetime.utcnow().isoformat() + "Z"
-            print(f"[{now_utc}] ⚠️ Nessun gol trovato negli incidents per event_id={event_id}")
-            sys.stdout.flush()
+            log.warning("⚠️ Nessun gol trovato negli incidents per event_id=%s", event_id)
             return None, 0
         
         # Ordina per minuto (cronologico)
@@ -618,42 +987,32 @@ def get_match_goal_minute(event_id, score_home, score_away, headers, goal_number
                 selected_goal = goals[1]
                 goal_desc = "secondo"
             else:
-                now_utc = datetime.utcnow().isoformat() + "Z"
-                print(f"[{now_utc}] ⚠️ Secondo gol non trovato (solo {len(goals)} gol disponibili) per event_id={event_id}")
-                sys.stdout.flush()
+                log.warning("⚠️ Secondo gol non trovato (solo %s gol disponibili) per event_id=%s", len(goals), event_id)
                 return None, 0
         else:
             # Numero gol non valido
             return None, 0
         
         goal_minute = selected_goal["minute"]
-        now_utc = datetime.utcnow().isoformat() + "Z"
-        print(f"[{now_utc}] ✅ Minuto ESATTO recuperato dall'API: {goal_desc} gol al minuto {goal_minute}' (event_id={event_id}, totale gol={len(goals)})")
-        sys.stdout.flush()
+        log.info("✅ Minuto ESATTO recuperato dall'API: %s gol al minuto %s' (event_id=%s, totale gol=%s)", goal_desc, goal_minute, event_id, len(goals))
         
         return goal_minute, 5  # Attendibilità massima perché è il minuto esatto dall'API
     except Exception as e:
-        now_utc = datetime.utcnow().isoformat() + "Z"
-        print(f"[{now_utc}] ⚠️ Errore recupero minuto gol da eventi: {e}")
-        sys.stdout.flush()
+        log.warning("⚠️ Errore recupero minuto gol da eventi: %s", e)
         return None, 0
 
 
-def send_message(home, away, league, country, first_score, first_min, second_score, second_min, reliability=0, event_id=None):
-    """Invia messaggio Telegram con i dettagli del pattern 1-1"""
-    global total_notifications_sent
-    
+def format_notification(home, away, league, country, first_score, first_min, second_score, second_min, reliability=0, event_id=None):
+    """Testo della notifica Telegram con i dettagli del pattern 1-1"""
     # Emoji per attendibilità
-    reliability_emoji = ["❌", "⚠️", "⚠️", "✅", "✅", "✅✅"]
-    reliability_idx = min(reliability, 5)
-    reliability_emoji_str = reliability_emoji[reliability_idx]
+    reliability_emoji_str = RELIABILITY_EMOJI[min(reliability, 5)]
 
     # Costruisci link SofaScore se event_id disponibile
     link = ""
     if event_id:
         link = f"\n🔗 https://www.sofascore.com/event/{event_id}"
 
-    text = (
+    return (
         f"⚽ GOL QR {reliability_emoji_str}\n\n"
         f"🏠 {home}\n"
         f"🆚 {away}\n"
@@ -661,31 +1020,91 @@ def send_message(home, away, league, country, first_score, first_min, second_sco
         f"⏱️ Minuto {first_score} ; {first_min}'\n"
         f"⏱️ Minuto {second_score} ; {second_min}'{link}"
     )
+
+
+def send_message(text, count=1):
+    """Invia un messaggio nella chat delle notifiche; count = notifiche 1-1 contenute nel messaggio"""
+    global total_notifications_sent
+    
+    # Più messaggi nello stesso ciclo: rispetta il limite di Telegram per chat
+    _wait_chat_slot(CHAT_ID)
     bot.send_message(chat_id=CHAT_ID, text=text)
     
-    # Aggiorna statistiche
-    total_notifications_sent += 1
-    today = datetime.now().strftime("%Y-%m-%d")
-    daily_notifications[today] += 1
+    # Aggiorna statistiche (lette dai comandi su altri thread)
+    with _stats_lock:
+        total_notifications_sent += count
+        today = date.today().toordinal()
+        if daily_notifications and daily_notifications[-1][0] == today:
+            daily_notifications[-1][1] += count
+        else:
+            daily_notifications.append([today, count])
+
+
+# Protegge i contatori di notifiche: totale e giornaliero vengono aggiornati insieme
+_stats_lock = Lock()
+
+
+def _notification_messages(notifications, limit=4000):
+    """Raggruppa le notifiche in messaggi da al massimo limit caratteri: genera (testo, notifiche incluse)"""
+    texts = []
+    group = []
+    cur_len = 0
+    for notification in notifications:
+        text = format_notification(*notification[2])
+        text_len = len(text) + 2  # +2 per la riga vuota di separazione
+        if texts and cur_len + text_len > limit:
+            yield "\n\n".join(texts), group
+            texts = []
+            group = []
+            cur_len = 0
+        texts.append(text)
+        group.append(notification)
+        cur_len += text_len
+    if texts:
+        yield "\n\n".join(texts), group
+
+
+def send_notifications(batch, active_matches, sent_matches):
+    """
+    Invia le notifiche raccolte durante il ciclo, unite in un solo messaggio (o pochi, se lunghe).
+    Se un invio fallisce le sue partite tornano in tracking, così vengono ritentate al ciclo successivo.
+    """
+    notifications = batch.notifications
+    batch.notifications = []
+    for text, group in _notification_messages(notifications):
+        try:
+            send_message(text, len(group))
+        except Exception as e:
+            log.error("❌ Invio notifiche fallito (%s partite): %s", len(group), e)
+            for match_id, match_data, _ in group:
+                sent_matches.pop(match_id, None)
+                active_matches[match_id] = match_data
+                batch.deadlist.discard(match_id)
+                batch.dirty_sent.add(match_id)
+                batch.dirty_active.add(match_id)
+                batch.dirty_deadlist.add(match_id)
+            continue
+        for _, match_data, _ in group:
+            log.info("✅ Notifica inviata: %s - %s", match_data.home, match_data.away)
 
 
-def cleanup_expired_matches(active_matches, current_matches_dict):
+def cleanup_expired_matches(active_matches, current_matches_dict, now_ts):
     """Rimuove partite scadute (>10 minuti di gioco dal primo gol)"""
     expired = []
     
     for match_id, match_data in active_matches.items():
         # Le partite 0-0 tracciate non scadono, rimangono tracciate finché non cambiano punteggio
-        if match_data.get("score") == "0-0":
+        if match_data.score == "0-0":
             continue  # Non rimuovere partite 0-0
         
         # Solo le partite con primo gol (1-0/0-1) possono scadere
-        first_goal_minute = match_data.get("first_goal_minute", 0)
+        first_goal_minute = match_data.first_goal_minute
         if first_goal_minute == 0:
             continue  # Se non c'è minuto del primo gol, non scadere
         
         # Cerca la partita nelle partite live attuali per ottenere il minuto corrente
         if match_id in current_matches_dict:
-            current_minute = current_matches_dict[match_id].get("minute")
+            current_minute = current_matches_dict[match_id].minute
             if current_minute is not None and current_minute > 0:
                 # Calcola differenza in minuti di gioco
                 elapsed_game_minutes = current_minute - first_goal_minute
@@ -693,21 +1112,131 @@ def cleanup_expired_matches(active_matches, current_matches_dict):
                     expired.append(match_id)
         else:
             # Se la partita non è più nelle partite live, rimuovila dopo un timeout
-            first_goal_time = match_data.get("first_goal_time")
-            if first_goal_time:
-                now = datetime.now()
-                elapsed = (now - first_goal_time).total_seconds() / 60
+            first_goal_time_ts = match_data.first_goal_time_ts
+            if first_goal_time_ts:
+                elapsed = (now_ts - first_goal_time_ts) / 60
                 if elapsed > 15:  # Timeout più lungo per sicurezza
                     expired.append(match_id)
     
     for match_id in expired:
         del active_matches[match_id]
-        print(f"Partita scaduta rimossa dal tracking: {match_id}")
+        log.info("Partita scaduta rimossa dal tracking: %s", match_id)
     
     return active_matches
 
 
+def prune_sent_matches(sent_matches, now_ts):
+    """
+    Rimuove le partite notificate più vecchie di SENT_RETENTION_DAYS (gli ID non si ripresentano),
+    insieme ai loro risultati definitivi in cache. Le voci senza data (vecchio formato) restano.
+    Ritorna gli ID rimossi.
+    """
+    cutoff = now_ts - SENT_RETENTION_DAYS * 86400
+    expired = []
+    for match_id, match_data in sent_matches.items():
+        notified_ts = _notified_ts(match_data)
+        if notified_ts and notified_ts < cutoff:
+            expired.append(match_id)
+    
+    finished_before = len(_finished_results)
+    for match_id in expired:
+        event_id = sent_matches.pop(match_id).get("event_id")
+        if event_id:
+            _finished_results.pop(str(event_id), None)
+    if len(_finished_results) != finished_before:
+        save_finished_results(_finished_results)
+    
+    if expired:
+        log.info("🧹 Rimosse %s partite notificate più vecchie di %s giorni", len(expired), SENT_RETENTION_DAYS)
+    return expired
+
+
 # ---------- LOGICA PRINCIPALE ----------
+def _results_from_periods(periods_by_num):
+    """
+    Calcola (result_1H, result_2H) dai periodi SofaScore indicizzati per numero.
+    Torna None se il periodo 1 o 2 non è disponibile.
+    """
+    period_1h = periods_by_num.get(1)
+    period_2h = periods_by_num.get(2)
+    if not (period_1h and period_2h):
+        return None
+    result_1h = f"{period_1h.get('homeScore', 0)}-{period_1h.get('awayScore', 0)}"
+    result_2h = f"{period_2h.get('homeScore', 0)}-{period_2h.get('awayScore', 0)}"
+    return result_1h, result_2h
+
+
+def _results_from_event(event_data, event_id):
+    """
+    Estrae (result_1H, result_2H) dai periodi della risposta /event/{id}.
+    Torna None se i periodi 1H e 2H non sono entrambi disponibili.
+    """
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("🔍 Risposta API /event/%s ricevuta, keys: %s", event_id, list(event_data.keys()))
+    
+    # Cerca i risultati nei periodi
+    event_obj = event_data.get("event", {})
+    periods = event_obj.get("periods", [])
+    if not periods:
+        log.debug("⚠️ Nessun periodo trovato in event_data")
+        return None
+    
+    # Indicizza i periodi per numero (1 = 1H, 2 = 2H o risultato finale)
+    by_num = {period.get("period"): period for period in periods}
+    log.debug("🔍 Periodi trovati: %s", list(by_num))
+    
+    results = _results_from_periods(by_num)
+    if results:
+        log.debug("✅ Risultati recuperati da /event: 1H=%s, 2H=%s", *results)
+        return results
+    
+    log.debug("⚠️ Periodi 1H o 2H non trovati (1H=%s, 2H=%s)", 1 in by_num, 2 in by_num)
+    return None
+
+
+def _results_from_incidents(data):
+    """
+    Calcola (result_1H, result_2H) contando i gol nella risposta /event/{id}/incidents.
+    Torna ('', '') se non ci sono gol utilizzabili.
+    """
+    incidents = (data or {}).get("incidents") or (data or {}).get("events") or []
+    
+    log.debug("🔍 Incidents trovati: %s", len(incidents))
+    
+    # Conta gol e autogol in un solo passaggio (l'ordine degli incidents non conta)
+    home_1h = away_1h = 0
+    home_ft = away_ft = 0
+    goals_count = 0
+    for inc in incidents:
+        goal = _incident_goal(inc)
+        if goal is None:
+            continue
+        minute, is_home, is_away = goal
+        
+        goals_count += 1
+        # Halftime: conteggia gol fino al 45'
+        if is_home:
+            home_ft += 1
+            if minute <= 45:
+                home_1h += 1
+        elif is_away:
+            away_ft += 1
+            if minute <= 45:
+                away_1h += 1
+    
+    log.debug("🔍 Gol trovati negli incidents: %s", goals_count)
+    
+    if not goals_count:
+        log.debug("⚠️ Nessun gol trovato, restituisco ('', '')")
+        return "", ""
+    
+    result_1h = f"{home_1h}-{away_1h}"
+    result_2h = f"{home_ft}-{away_ft}"
+    log.debug("✅ Risultati calcolati da incidents: 1H=%s, 2H=%s", result_1h, result_2h)
+    
+    return result_1h, result_2h
+
+
 def get_scores_from_incidents(event_id, headers):
     """
     Recupera il risultato all'intervallo (1H) e finale (2H) dall'API SofaScore.
@@ -717,161 +1246,40 @@ def get_scores_from_incidents(event_id, headers):
         if not event_id:
             return "", ""
         
+        # I risultati delle partite finite non cambiano più: nessuna chiamata API
+        finished = _finished_results.get(str(event_id))
+        if finished:
+            return tuple(finished)
+        
         # Prova prima a recuperare dal dettaglio evento (più affidabile per partite finite)
         try:
             url = f"{SOFASCORE_PROXY_BASE}/event/{event_id}"
-            now_utc = datetime.utcnow().isoformat() + "Z"
-            print(f"[{now_utc}] 🔍 DEBUG: Chiamata API /event/{event_id} per recuperare risultati")
-            sys.stdout.flush()
+            log.debug("🔍 Chiamata API /event/%s per recuperare risultati", event_id)
             
-            event_data = _fetch_sofascore_json(url, headers)
+            event_data = _fetch_event_json(url, headers)
             if event_data:
-                print(f"[{now_utc}] 🔍 DEBUG: Risposta API /event/{event_id} ricevuta, keys: {list(event_data.keys())}")
-                sys.stdout.flush()
-                
-                # Cerca i risultati nei periodi
-                event_obj = event_data.get("event", {})
-                periods = event_obj.get("periods", [])
-                
-                print(f"[{now_utc}] 🔍 DEBUG: Periodi trovati: {len(periods)}")
-                sys.stdout.flush()
-                
-                if periods:
-                    # Primo periodo (1H)
-                    period_1h = None
-                    # Secondo periodo (2H) o risultato finale
-                    period_2h = None
-                    
-                    for period in periods:
-                        period_num = period.get("period")
-                        print(f"[{now_utc}] 🔍 DEBUG: Periodo trovato: {period_num}, homeScore={period.get('homeScore')}, awayScore={period.get('awayScore')}")
-                        sys.stdout.flush()
-                        if period_num == 1:
-                            period_1h = period
-                        elif period_num == 2:
-                            period_2h = period
-                    
-                    # Se abbiamo i periodi, usa quelli
-                    if period_1h and period_2h:
-                        home_1h = period_1h.get("homeScore", 0)
-                        away_1h = period_1h.get("awayScore", 0)
-                        home_ft = period_2h.get("homeScore", 0)
-                        away_ft = period_2h.get("awayScore", 0)
-                        result_1h = f"{home_1h}-{away_1h}"
-                        result_2h = f"{home_ft}-{away_ft}"
-                        print(f"[{now_utc}] ✅ DEBUG: Risultati recuperati da /event: 1H={result_1h}, 2H={result_2h}")
-                        sys.stdout.flush()
-                        return result_1h, result_2h
-                    else:
-                        print(f"[{now_utc}] ⚠️ DEBUG: Periodi 1H o 2H non trovati (1H={period_1h is not None}, 2H={period_2h is not None})")
-                        sys.stdout.flush()
-                else:
-                    print(f"[{now_utc}] ⚠️ DEBUG: Nessun periodo trovato in event_data")
-                    sys.stdout.flush()
+                results = _results_from_event(event_data, event_id)
+                if results:
+                    status = event_data.get("event", {}).get("status", {})
+                    status_type = (status.get("type") or "").lower()
+                    if status_type in FINISHED_STATUSES:
+                        _finished_results[str(event_id)] = list(results)
+                    return results
             else:
-                print(f"[{now_utc}] ⚠️ DEBUG: event_data è None o vuoto")
-                sys.stdout.flush()
+                log.debug("⚠️ event_data è None o vuoto")
         except Exception as e:
-            now_utc = datetime.utcnow().isoformat() + "Z"
-            print(f"[{now_utc}] ⚠️ DEBUG: Errore recupero da /event/{event_id}: {e}")
-            sys.stdout.flush()
+            log.debug("⚠️ Errore recupero da /event/%s: %s", event_id, e)
             pass  # Fallback agli incidents
         
         # Fallback: calcola dai incidents
-        now_utc = datetime.utcnow().isoformat() + "Z"
-        print(f"[{now_utc}] 🔍 DEBUG: Fallback a /incidents per event_id {event_id}")
-        sys.stdout.flush()
+        log.debug("🔍 Fallback a /incidents per event_id %s", event_id)
         
         url = f"{SOFASCORE_PROXY_BASE}/event/{event_id}/incidents"
-        data = _fetch_sofascore_json(url, headers)
-        incidents = (data or {}).get("incidents") or (data or {}).get("events") or []
-        
-        print(f"[{now_utc}] 🔍 DEBUG: Incidents trovati: {len(incidents)}")
-        sys.stdout.flush()
-        
-        # Estrai solo gol e autogol
-        goals = []
-        for inc in incidents:
-            inc_type = inc.get("type", {})
-            type_id = inc_type.get("id") if isinstance(inc_type, dict) else inc_type
-            
-            # Type 100 = goal, 101 = own goal
-            if type_id in [100, 101]:
-                minute = inc.get("minute")
-                if minute is None:
-                    continue
-                
-                # Estrai informazioni squadra (può essere isHome/isAway o team)
-                is_home = inc.get("isHome")
-                is_away = inc.get("isAway")
-                
-                # Se non trovato con isHome/isAway, prova con team
-                if is_home is None and is_away is None:
-                    team = inc.get("team", {})
-                    if isinstance(team, dict):
-                        # Controlla se è la squadra di casa
-                        if team.get("id") == inc.get("homeTeam", {}).get("id") if isinstance(inc.get("homeTeam"), dict) else False:
-                            is_home = True
-                            is_away = False
-                        elif team.get("id") == inc.get("awayTeam", {}).get("id") if isinstance(inc.get("awayTeam"), dict) else False:
-                            is_home = False
-                            is_away = True
-                
-                # Se ancora non abbiamo informazioni sulla squadra, prova a dedurlo dal tipo
-                if is_home is None and is_away is None:
-                    # Se non possiamo determinare la squadra, salta questo gol
-                    # (potrebbe essere un gol annullato o un errore nei dati)
-                    continue
-                
-                # Normalizza: se uno è True, l'altro deve essere False
-                if is_home is True:
-                    is_away = False
-                elif is_away is True:
-                    is_home = False
-                elif is_home is None:
-                    is_home = False
-                elif is_away is None:
-                    is_away = False
-                
-                goals.append({"minute": minute, "is_home": bool(is_home), "is_away": bool(is_away)})
-        
-        print(f"[{now_utc}] 🔍 DEBUG: Gol trovati negli incidents: {len(goals)}")
-        sys.stdout.flush()
-        
-        if not goals:
-            print(f"[{now_utc}] ⚠️ DEBUG: Nessun gol trovato, restituisco ('', '')")
-            sys.stdout.flush()
-            return "", ""
-        
-        # Ordina per minuto
-        goals.sort(key=lambda g: g["minute"])
-        
-        # Calcola risultati
-        home_1h = away_1h = 0
-        home_ft = away_ft = 0
-        for g in goals:
-            if g["is_home"]:
-                home_ft += 1
-            elif g["is_away"]:
-                away_ft += 1
-            # Halftime: conteggia gol fino al 45'
-            if g["minute"] <= 45:
-                if g["is_home"]:
-                    home_1h += 1
-                elif g["is_away"]:
-                    away_1h += 1
-        
-        result_1h = f"{home_1h}-{away_1h}"
-        result_2h = f"{home_ft}-{away_ft}"
-        print(f"[{now_utc}] ✅ DEBUG: Risultati calcolati da incidents: 1H={result_1h}, 2H={result_2h}")
-        sys.stdout.flush()
-        
-        return result_1h, result_2h
+        data = _fetch_event_json(url, headers)
+        return _results_from_incidents(data)
     except Exception as e:
         # Log errore per debug
-        now_utc = datetime.utcnow().isoformat() + "Z"
-        print(f"[{now_utc}] ⚠️ Errore recupero risultati per event_id {event_id}: {e}")
-        sys.stdout.flush()
+        log.warning("⚠️ Errore recupero risultati per event_id %s: %s", event_id, e)
         return "", ""
 
 
@@ -884,40 +1292,34 @@ def update_results_for_sent_matches(sent_matches, current_matches_dict, max_per_
         sent_matches: Dict delle partite già notificate
         current_matches_dict: Dict delle partite live attuali
         max_per_cycle: Numero massimo di partite da processare per ciclo (None = tutte)
-    """
-    if not sent_matches:
-        return
     
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "application/json",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Referer": "https://www.sofascore.com/",
-        "Origin": "https://www.sofascore.com"
-    }
+    Returns:
+        Set degli ID delle partite i cui risultati sono stati aggiornati
+    """
+    updated_ids = set()
     
-    # Filtra solo le partite che hanno bisogno di aggiornamento
+    # Filtra solo le partite che hanno bisogno di aggiornamento, in un solo passaggio.
+    # Itera sent_matches (ordine di inserimento): con max_per_cycle si aggiornano prima le più vecchie
     matches_to_update = []
     for match_id, match_data in sent_matches.items():
-        if not isinstance(match_data, dict) or not match_data:
+        if not isinstance(match_data, dict) or not match_data.get("event_id"):
             continue
-        
-        event_id = match_data.get("event_id")
-        if not event_id:
+        has_halftime = bool(match_data.get("result_1H"))
+        has_final = bool(match_data.get("result_2H"))
+        if has_halftime and has_final:
             continue
         
         live_match = current_matches_dict.get(match_id)
-        minute = live_match.get("minute") if live_match else None
-        period = live_match.get("period") if live_match else None
-        status_type = (live_match.get("status_type") or "").lower() if live_match else ""
-        
         halftime_ready = False
         final_ready = False
         
         if live_match:
+            minute = live_match.minute
+            period = live_match.period
+            status_type = live_match.status_type  # Già in minuscolo dallo scraping
             if (minute is not None and minute >= 45) or (period and period >= 2):
                 halftime_ready = True
-            if status_type in ("finished", "after overtime", "after penalty", "afterpenalties", "after overtime and penalties"):
+            if status_type in FINISHED_STATUSES:
                 final_ready = True
             elif minute is not None and minute >= 95:
                 final_ready = True
@@ -926,46 +1328,64 @@ def update_results_for_sent_matches(sent_matches, current_matches_dict, max_per_
             halftime_ready = True
             final_ready = True
         
-        need_halftime = halftime_ready and not match_data.get("result_1H")
-        need_final = final_ready and not match_data.get("result_2H")
+        need_halftime = halftime_ready and not has_halftime
+        need_final = final_ready and not has_final
         
         if need_halftime or need_final:
             matches_to_update.append((match_id, match_data, live_match, need_halftime, need_final))
     
+    # Nessun risultato da aggiornare: niente header né chiamate API
+    if not matches_to_update:
+        return updated_ids
+    
     # Limita il numero di partite processate per ciclo (solo se max_per_cycle è specificato)
     if max_per_cycle is not None and len(matches_to_update) > max_per_cycle:
-        now_utc = datetime.utcnow().isoformat() + "Z"
-        print(f"[{now_utc}] ⚡ Limite update_results: processando {max_per_cycle} su {len(matches_to_update)} partite che necessitano aggiornamento")
-        sys.stdout.flush()
+        log.info("⚡ Limite update_results: processando %s su %s partite che necessitano aggiornamento", max_per_cycle, len(matches_to_update))
         matches_to_update = matches_to_update[:max_per_cycle]
     
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Accept": "application/json",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Referer": "https://www.sofascore.com/",
+        "Origin": "https://www.sofascore.com"
+    }
+    
+    # OTTIMIZZAZIONE: Prima controlla se i risultati sono già disponibili dalla prima chiamata API
+    results = {}
+    to_fetch = []
     for match_id, match_data, live_match, need_halftime, need_final in matches_to_update:
-        event_id = match_data.get("event_id")
-        
-        # OTTIMIZZAZIONE: Prima controlla se i risultati sono già disponibili dalla prima chiamata API
         r1 = None
         r2 = None
         
         if live_match:
             # Se la partita è ancora live, controlla se abbiamo già i risultati dalla prima chiamata
-            if need_halftime and live_match.get("result_1h"):
-                r1 = live_match.get("result_1h")
-                now_utc = datetime.utcnow().isoformat() + "Z"
-                print(f"[{now_utc}] ✅ Risultato 1H recuperato dalla prima chiamata per {match_id}: {r1}")
-                sys.stdout.flush()
+            if need_halftime and live_match.result_1h:
+                r1 = live_match.result_1h
+                log.info("✅ Risultato 1H recuperato dalla prima chiamata per %s: %s", match_id, r1)
             
-            if need_final and live_match.get("result_2h"):
-                r2 = live_match.get("result_2h")
-                now_utc = datetime.utcnow().isoformat() + "Z"
-                print(f"[{now_utc}] ✅ Risultato 2H recuperato dalla prima chiamata per {match_id}: {r2}")
-                sys.stdout.flush()
+            if need_final and live_match.result_2h:
+                r2 = live_match.result_2h
+                log.info("✅ Risultato 2H recuperato dalla prima chiamata per %s: %s", match_id, r2)
         
-        # Solo se non disponibili dalla prima chiamata, fai chiamata API aggiuntiva
+        results[match_id] = (r1, r2)
+        # Solo se non disponibili dalla prima chiamata, serve una chiamata API aggiuntiva
         if (need_halftime and not r1) or (need_final and not r2):
-            now_utc = datetime.utcnow().isoformat() + "Z"
-            print(f"[{now_utc}] 🔍 Risultati non disponibili dalla prima chiamata, faccio chiamata API aggiuntiva per {match_id}")
-            sys.stdout.flush()
-            api_r1, api_r2 = get_scores_from_incidents(event_id, headers)
+            log.info("🔍 Risultati non disponibili dalla prima chiamata, faccio chiamata API aggiuntiva per %s", match_id)
+            to_fetch.append((match_id, match_data.get("event_id")))
+    
+    # Le chiamate API aggiuntive sono indipendenti tra loro: eseguile in parallelo
+    finished_before = len(_finished_results)
+    futures = {
+        match_id: _http_executor.submit(get_scores_from_incidents, event_id, headers)
+        for match_id, event_id in to_fetch
+    }
+    
+    for match_id, match_data, live_match, need_halftime, need_final in matches_to_update:
+        r1, r2 = results[match_id]
+        
+        if match_id in futures:
+            api_r1, api_r2 = futures[match_id].result()
             if need_halftime and not r1:
                 r1 = api_r1
             if need_final and not r2:
@@ -973,274 +1393,355 @@ def update_results_for_sent_matches(sent_matches, current_matches_dict, max_per_
         
         if need_halftime and r1:
             match_data["result_1H"] = r1
-            now_utc = datetime.utcnow().isoformat() + "Z"
-            print(f"[{now_utc}] ✅ Risultato 1H salvato per {match_id}: {r1}")
-            sys.stdout.flush()
+            updated_ids.add(match_id)
+            log.info("✅ Risultato 1H salvato per %s: %s", match_id, r1)
         
         if need_final and r2:
             match_data["result_2H"] = r2
-            now_utc = datetime.utcnow().isoformat() + "Z"
-            print(f"[{now_utc}] ✅ Risultato finale salvato per {match_id}: {r2}")
-            sys.stdout.flush()
+            updated_ids.add(match_id)
+            log.info("✅ Risultato finale salvato per %s: %s", match_id, r2)
+    
+    # Persisti i nuovi risultati definitivi, così sopravvivono ai riavvii
+    if len(_finished_results) != finished_before:
+        save_finished_results(_finished_results)
+    
+    return updated_ids
+
+
+def _track_scoreless(match, match_id, active_matches, batch):
+    """CASO 0: traccia le partite 0-0 per rilevare quando diventano 1-0/0-1"""
+    home = match.home
+    away = match.away
+    league = match.league
+    country = match.country
+    minute = match.minute
+    
+    if match_id not in active_matches:
+        # Traccia partita 0-0 per rilevare quando diventa 1-0/0-1
+        active_matches[match_id] = ActiveMatch(
+            home=home,
+            away=away,
+            league=league,
+            country=country,
+            score="0-0",
+            last_minute=minute if minute is not None else 0,
+            last_period=match.period
+        )
+        batch.dirty_active.add(match_id)
+
+
+def _track_first_goal(match, match_id, active_matches, batch, now):
+    """CASO 1: partita che passa da 0-0 a 1-0 o 0-1 (gol appena segnato!)"""
+    score_home = match.score_home
+    home = match.home
+    away = match.away
+    league = match.league
+    country = match.country
+    minute = match.minute
+    
+    if match_id in active_matches:
+        match_data = active_matches[match_id]
+        # Se era 0-0, ora è diventata 1-0/0-1: il gol è stato segnato ora!
+        if match_data.score == "0-0":
+            first_score = "1-0" if score_home == 1 else "0-1"
+            period = match.period  # 1 = primo tempo, 2 = secondo tempo
+
+            # Il minuto del gol è il minuto corrente (o poco prima, massimo 1 minuto)
+            goal_minute = minute if minute is not None else 0
+            if goal_minute > 0:
+                # Sottrai 0-1 minuto per essere più precisi (il gol è stato segnato poco prima)
+                goal_minute = max(1, goal_minute - 1)
+
+            # Aggiorna con i dati del primo gol
+            active_matches[match_id] = ActiveMatch(
+                home=home,
+                away=away,
+                league=league,
+                country=country,
+                first_goal_time_ts=now.timestamp(),
+                first_score=first_score,
+                first_goal_minute=goal_minute,
+                first_goal_period=period,
+                first_goal_reliability=match.reliability  # Attendibilità alta perché rilevato al momento
+            )
+            batch.dirty_active.add(match_id)
+            log.info("✅ Partita tracciata: %s - %s (0-0 → %s) al minuto %s' - ESATTO (rilevato al momento)", home, away, first_score, goal_minute)
+    elif match_id not in active_matches:
+        # Partita già 1-0/0-1 quando viene rilevata (non era tracciata come 0-0)
+        # Non possiamo sapere il minuto esatto, quindi non tracciarla
+        first_score = "1-0" if score_home == 1 else "0-1"
+        log.warning("⚠️ Partita NON tracciata: %s - %s (%s) - già in corso quando rilevata (minuto esatto non disponibile)", home, away, first_score)
+
+
+def _check_equalizer(match, match_id, active_matches, sent_matches, batch, now):
+    """CASO 2: partita già tracciata (1-0/0-1) che diventa 1-1 (secondo gol appena segnato!)"""
+    home = match.home
+    away = match.away
+    league = match.league
+    country = match.country
+    minute = match.minute
+    
+    if match_id in active_matches:
+        match_data = active_matches[match_id]
+        # Verifica che sia una partita tracciata con primo gol (non una 0-0)
+        if not match_data.first_score:
+            # Era una 0-0, non tracciarla come 1-1
+            return
+
+        first_score = match_data.first_score
+        first_min = match_data.first_goal_minute
+        first_period = match_data.first_goal_period  # 1 = primo tempo, 2 = secondo tempo
+
+        # Il minuto del secondo gol è il minuto corrente (o poco prima, massimo 1 minuto)
+        second_min = minute if minute is not None else 0
+        if second_min > 0:
+            # Sottrai 0-1 minuto per essere più precisi (il gol è stato segnato poco prima)
+            second_min = max(1, second_min - 1)
+
+        second_goal_reliability = match.reliability  # Attendibilità alta perché rilevato al momento
+
+        second_period = match.period  # Metà tempo corrente
+
+        # VERIFICA: Entrambi i gol devono essere nella stessa metà tempo
+        same_period = True
+        if first_period is not None and second_period is not None:
+            same_period = (first_period == second_period)
+        elif first_min > 0 and second_min > 0:
+            # Fallback: determina metà tempo dal minuto
+            first_is_first_half = (first_min <= 45)
+            second_is_first_half = (second_min <= 45)
+            same_period = (first_is_first_half == second_is_first_half)
+
+        if not same_period:
+            # Gol in metà tempo diverse, non notificare
+            del active_matches[match_id]
+            batch.dirty_active.add(match_id)
+            batch.add_to_deadlist(match_id)  # Aggiungi a deadlist perché non può più essere tracciata
+            log.info("Partita scartata (gol in metà tempo diverse): %s - %s (%s al %s' → 1-1 al %s')", home, away, first_score, first_min, second_min)
+            return
+
+        # Calcola differenza in minuti di gioco
+        if first_min > 0 and second_min > 0:
+            elapsed_game_minutes = second_min - first_min
+        else:
+            # Se non abbiamo minuti, non notificare
+            log.warning("⚠️ Notifica NON inviata: %s - %s (%s → 1-1) - minuti non disponibili (first_min=%s, second_min=%s)", home, away, first_score, first_min, second_min)
+            del active_matches[match_id]
+            batch.dirty_active.add(match_id)
+            batch.add_to_deadlist(match_id)  # Aggiungi a deadlist
+            return
+
+        # Se è diventata 1-1 entro 10 minuti di gioco E stessa metà tempo, invia notifica
+        if elapsed_game_minutes <= 10 and elapsed_game_minutes >= 0:
+            # Calcola attendibilità combinata (minimo tra i due)
+            first_reliability = match_data.first_goal_reliability
+            combined_reliability = min(first_reliability, second_goal_reliability)
+
+            # L'invio avviene a fine ciclo, in un unico messaggio con le altre notifiche (send_notifications)
+            batch.notifications.append((
+                match_id,
+                match_data,
+                (home, away, league, country, first_score, first_min, "1-1", second_min, combined_reliability, match.event_id),
+            ))
+            # Salva dettagli della partita notificata
+            sent_matches[match_id] = {
+                "home": home,
+                "away": away,
+                "league": league,
+                "country": country,
+                "event_id": match.event_id,
+                "first_score": first_score,
+                "first_minute": first_min,
+                "second_minute": second_min,
+                "reliability": combined_reliability,
+                "notified_at": now.isoformat(),
+                "notified_at_ts": now.timestamp()  # Per ordinare/mostrare senza parsing ISO
+            }
+            batch.dirty_sent.add(match_id)
+            del active_matches[match_id]
+            batch.dirty_active.add(match_id)
+            batch.add_to_deadlist(match_id)  # Aggiungi a deadlist perché già notificata
+            # Entrambi i minuti sono esatti perché rilevati al momento (0-0 → 1-0/0-1 e 1-0/0-1 → 1-1)
+            log.info("🔔 Notifica 1-1 in coda: %s - %s (%s al %s' [ESATTO] → 1-1 al %s' [ESATTO]) - %.1f min di gioco (stessa metà tempo, attendibilità %s/5)", home, away, first_score, first_min, second_min, elapsed_game_minutes, combined_reliability)
+        else:
+            # Scaduta, rimuovi dal tracking e aggiungi a deadlist
+            del active_matches[match_id]
+            batch.dirty_active.add(match_id)
+            batch.add_to_deadlist(match_id)  # Aggiungi a deadlist perché scaduta
+            log.info("Partita scaduta (>%.1f min di gioco): %s - %s", elapsed_game_minutes, home, away)
+
+
+def _untrack_changed_score(match, match_id, active_matches, batch):
+    """CASO 3: partita tracciata che cambia punteggio in modo non interessante"""
+    home = match.home
+    away = match.away
+    score_home = match.score_home
+    score_away = match.score_away
+    
+    match_data = active_matches[match_id]
+    # Se era 0-0 e ora non è più 0-0 e non è 1-0/0-1, rimuovila e aggiungi a deadlist
+    if match_data.score == "0-0":
+        # Era 0-0, ora è cambiata ma non è 1-0/0-1 (es. 2-0, 0-2, 1-1, ecc.)
+        del active_matches[match_id]
+        batch.dirty_active.add(match_id)
+        # Se non è 1-1 (che viene gestito nel CASO 2), aggiungi a deadlist
+        if not (score_home == 1 and score_away == 1):
+            batch.add_to_deadlist(match_id)
+        log.warning("⚠️ Partita rimossa dal tracking: %s - %s (era 0-0, ora %s-%s)", home, away, score_home, score_away)
+    # Se era 1-0/0-1 e ora non è più 1-0/0-1 e non è 1-1, rimuovila e aggiungi a deadlist
+    elif match_data.first_score:
+        # Era 1-0/0-1, ora è cambiata ma non è 1-1 (es. 2-0, 0-2, 2-1, ecc.)
+        del active_matches[match_id]
+        batch.dirty_active.add(match_id)
+        batch.add_to_deadlist(match_id)  # Aggiungi a deadlist perché non può più diventare 1-1
+        log.info("Partita rimossa dal tracking (punteggio cambiato): %s - %s (era %s, ora %s-%s)", home, away, match_data.first_score, score_home, score_away)
+
 
 def process_matches():
     """Processa tutte le partite live e gestisce il tracking 1-0/0-1 → 1-1"""
-    active_matches = load_active_matches()
-    sent_matches = load_sent_matches()  # Ora è un dict, non un set
-    deadlist = load_deadlist()  # Carica deadlist
-    
-    # Scraping partite live
-    print("Scraping SofaScore...")
-    live_matches = scrape_sofascore()
-    now_utc = datetime.utcnow().isoformat() + "Z"
-    print(f"[{now_utc}] ✅ Trovate {len(live_matches)} partite live totali dalla API")
-    sys.stdout.flush()
-    
-    # Crea dizionario per lookup veloce delle partite live
-    current_matches_dict = {}
-    live_match_ids = set()
-    for match in live_matches:
-        match_id = get_match_id(match["home"], match["away"], match["league"])
-        current_matches_dict[match_id] = match
-        live_match_ids.add(match_id)
-    
-    # Aggiorna deadlist: aggiungi partite che devono essere deadlisted
-    new_deadlisted = 0
-    for match in live_matches:
-        match_id = get_match_id(match["home"], match["away"], match["league"])
-        if match_id not in deadlist:
-            should_deadlist, reason = should_be_deadlisted(match, sent_matches, active_matches)
-            if should_deadlist:
-                deadlist.add(match_id)
-                new_deadlisted += 1
-                now_utc = datetime.utcnow().isoformat() + "Z"
-                print(f"[{now_utc}] 🚫 Partita aggiunta alla deadlist: {match['home']} - {match['away']} ({match['score_home']}-{match['score_away']}) - motivo: {reason}")
-                sys.stdout.flush()
-    
-    # Pulisci deadlist: rimuovi partite che non sono più live (potrebbero essere finite o non più disponibili)
-    removed_from_deadlist = 0
-    deadlist_copy = deadlist.copy()
-    for match_id in deadlist_copy:
-        if match_id not in live_match_ids:
-            # Mantieni in deadlist solo se è già stata notificata (non rimuoverla mai)
-            if match_id not in sent_matches:
-                deadlist.discard(match_id)
-                removed_from_deadlist += 1
-    
-    if new_deadlisted > 0 or removed_from_deadlist > 0:
-        now_utc = datetime.utcnow().isoformat() + "Z"
-        print(f"[{now_utc}] 📊 Deadlist aggiornata: +{new_deadlisted} nuove, -{removed_from_deadlist} rimosse, totale: {len(deadlist)}")
-        sys.stdout.flush()
-    
-    # Rimuovi partite scadute (>10 minuti di gioco)
-    active_matches = cleanup_expired_matches(active_matches, current_matches_dict)
-    
-    now = datetime.now()
-    
-    # Conta quante partite vengono saltate per deadlist
-    skipped_deadlist = 0
-    
-    for match in live_matches:
-        home = match["home"]
-        away = match["away"]
-        score_home = match["score_home"]
-        score_away = match["score_away"]
-        league = match["league"]
-        country = match.get("country", "Unknown")
-        minute = match.get("minute")
-        
-        match_id = get_match_id(home, away, league)
-        
-        # OTTIMIZZAZIONE: Se la partita è in deadlist, salta completamente
-        if match_id in deadlist:
-            skipped_deadlist += 1
-            continue
+    active_matches = _active_matches
+    sent_matches = _sent_matches
+    deadlist = _deadlist
+    
+    with StateBatch(active_matches, sent_matches, deadlist) as batch:
+        # Scraping partite live
+        log.info("Scraping SofaScore...")
+        live_matches, current_matches_dict = cached_scrape(max_age=SCRAPE_POLL_MAX_AGE)
+        log.info("✅ Trovate %s partite live totali dalla API", len(live_matches))
+    
+        # Aggiorna deadlist: aggiungi partite che devono essere deadlisted
+        # (current_matches_dict è l'indice match_id -> partita calcolato con lo scraping)
+        new_deadlisted = 0
+        for match in live_matches:
+            match_id = match.match_id
+            if match_id not in deadlist:
+                should_deadlist, reason = should_be_deadlisted(match, sent_matches, active_matches)
+                if should_deadlist:
+                    batch.add_to_deadlist(match_id)
+                    new_deadlisted += 1
+                    log.info("🚫 Partita aggiunta alla deadlist: %s - %s (%s-%s) - motivo: %s", match.home, match.away, match.score_home, match.score_away, reason)
+    
+        # Pulisci deadlist: rimuovi partite che non sono più live (potrebbero essere finite o non più disponibili)
+        # Mantieni in deadlist solo quelle già notificate (non rimuoverle mai)
+        stale = deadlist - current_matches_dict.keys() - sent_matches.keys()
+        deadlist -= stale
+        batch.dirty_deadlist |= stale
+        removed_from_deadlist = len(stale)
+    
+        if new_deadlisted > 0 or removed_from_deadlist > 0:
+            log.info("📊 Deadlist aggiornata: +%s nuove, -%s rimosse, totale: %s", new_deadlisted, removed_from_deadlist, len(deadlist))
+    
+        # Un solo istante di riferimento per tutto il ciclo
+        now = datetime.now()
+    
+        # Rimuovi partite scadute (>10 minuti di gioco)
+        tracked_before = set(active_matches)
+        active_matches = cleanup_expired_matches(active_matches, current_matches_dict, now.timestamp())
+        batch.dirty_active.update(tracked_before - active_matches.keys())
+    
+        # Conta quante partite vengono saltate per deadlist
+        skipped_deadlist = 0
+    
+        for match in live_matches:
+            match_id = match.match_id
+        
+            # OTTIMIZZAZIONE: Se la partita è in deadlist, salta completamente
+            if match_id in deadlist:
+                skipped_deadlist += 1
+                continue
         
-        # Se la partita è già stata notificata, salta (e aggiungi a deadlist)
-        if match_id in sent_matches:
-            deadlist.add(match_id)
-            continue
+            # Se la partita è già stata notificata, salta (e aggiungi a deadlist)
+            if match_id in sent_matches:
+                batch.add_to_deadlist(match_id)
+                continue
         
-        # CASO 0: Traccia partite 0-0 per rilevare quando diventano 1-0/0-1
-        if score_home == 0 and score_away == 0:
-            if match_id not in active_matches:
-                # Traccia partita 0-0 per rilevare quando diventa 1-0/0-1
-                active_matches[match_id] = {
-                    "home": home,
-                    "away": away,
-                    "league": league,
-                    "country": country,
-                    "score": "0-0",
-                    "last_minute": minute if minute is not None else 0,
-                    "last_period": match.get("period")
-                }
-        
-        # CASO 1: Partita passa da 0-0 a 1-0 o 0-1 (gol appena segnato!)
-        elif (score_home == 1 and score_away == 0) or (score_home == 0 and score_away == 1):
-            if match_id in active_matches:
-                match_data = active_matches[match_id]
-                # Se era 0-0, ora è diventata 1-0/0-1: il gol è stato segnato ora!
-                if match_data.get("score") == "0-0":
-                    first_score = "1-0" if score_home == 1 else "0-1"
-                    period = match.get("period")  # 1 = primo tempo, 2 = secondo tempo
-                    
-                    # Il minuto del gol è il minuto corrente (o poco prima, massimo 1 minuto)
-                    goal_minute = minute if minute is not None else 0
-                    if goal_minute > 0:
-                        # Sottrai 0-1 minuto per essere più precisi (il gol è stato segnato poco prima)
-                        goal_minute = max(1, goal_minute - 1)
-                    
-                    # Aggiorna con i dati del primo gol
-                    active_matches[match_id] = {
-                        "home": home,
-                        "away": away,
-                        "league": league,
-                        "country": country,
-                        "first_goal_time": now,
-                        "first_score": first_score,
-                        "first_goal_minute": goal_minute,
-                        "first_goal_period": period,
-                        "first_goal_reliability": match.get("reliability", 4)  # Attendibilità alta perché rilevato al momento
-                    }
-                    now_utc = datetime.utcnow().isoformat() + "Z"
-                    print(f"[{now_utc}] ✅ Partita tracciata: {home} - {away} (0-0 → {first_score}) al minuto {goal_minute}' - ESATTO (rilevato al momento)")
-                    sys.stdout.flush()
-            elif match_id not in active_matches:
-                # Partita già 1-0/0-1 quando viene rilevata (non era tracciata come 0-0)
-                # Non possiamo sapere il minuto esatto, quindi non tracciarla
-                now_utc = datetime.utcnow().isoformat() + "Z"
-                first_score = "1-0" if score_home == 1 else "0-1"
-                print(f"[{now_utc}] ⚠️ Partita NON tracciata: {home} - {away} ({first_score}) - già in corso quando rilevata (minuto esatto non disponibile)")
-                sys.stdout.flush()
-        
-        # CASO 2: Partita già tracciata (1-0/0-1) che diventa 1-1 (secondo gol appena segnato!)
-        elif score_home == 1 and score_away == 1:
-            if match_id in active_matches:
-                match_data = active_matches[match_id]
-                # Verifica che sia una partita tracciata con primo gol (non una 0-0)
-                if "first_score" not in match_data:
-                    # Era una 0-0, non tracciarla come 1-1
-                    continue
-                
-                first_score = match_data["first_score"]
-                first_min = match_data.get("first_goal_minute", 0)
-                first_period = match_data.get("first_goal_period")  # 1 = primo tempo, 2 = secondo tempo
-                
-                # Il minuto del secondo gol è il minuto corrente (o poco prima, massimo 1 minuto)
-                second_min = minute if minute is not None else 0
-                if second_min > 0:
-                    # Sottrai 0-1 minuto per essere più precisi (il gol è stato segnato poco prima)
-                    second_min = max(1, second_min - 1)
-                
-                second_goal_reliability = match.get("reliability", 4)  # Attendibilità alta perché rilevato al momento
-                
-                second_period = match.get("period")  # Metà tempo corrente
-                
-                # VERIFICA: Entrambi i gol devono essere nella stessa metà tempo
-                same_period = True
-                if first_period is not None and second_period is not None:
-                    same_period = (first_period == second_period)
-                elif first_min > 0 and second_min > 0:
-                    # Fallback: determina metà tempo dal minuto
-                    first_is_first_half = (first_min <= 45)
-                    second_is_first_half = (second_min <= 45)
-                    same_period = (first_is_first_half == second_is_first_half)
-                
-                if not same_period:
-                    # Gol in metà tempo diverse, non notificare
-                    del active_matches[match_id]
-                    deadlist.add(match_id)  # Aggiungi a deadlist perché non può più essere tracciata
-                    print(f"Partita scartata (gol in metà tempo diverse): {home} - {away} ({first_score} al {first_min}' → 1-1 al {second_min}')")
-                    continue
-                
-                # Calcola differenza in minuti di gioco
-                if first_min > 0 and second_min > 0:
-                    elapsed_game_minutes = second_min - first_min
-                else:
-                    # Se non abbiamo minuti, non notificare
-                    now_utc = datetime.utcnow().isoformat() + "Z"
-                    print(f"[{now_utc}] ⚠️ Notifica NON inviata: {home} - {away} ({first_score} → 1-1) - minuti non disponibili (first_min={first_min}, second_min={second_min})")
-                    sys.stdout.flush()
-                    del active_matches[match_id]
-                    deadlist.add(match_id)  # Aggiungi a deadlist
-                    continue
-                
-                # Se è diventata 1-1 entro 10 minuti di gioco E stessa metà tempo, invia notifica
-                if elapsed_game_minutes <= 10 and elapsed_game_minutes >= 0:
-                    # Calcola attendibilità combinata (minimo tra i due)
-                    first_reliability = match_data.get("first_goal_reliability", 0)
-                    combined_reliability = min(first_reliability, second_goal_reliability)
-                    
-                    send_message(home, away, league, country, first_score, first_min, "1-1", second_min, combined_reliability, match.get("event_id"))
-                    # Salva dettagli della partita notificata
-                    sent_matches[match_id] = {
-                        "home": home,
-                        "away": away,
-                        "league": league,
-                        "country": country,
-                        "event_id": match.get("event_id"),
-                        "first_score": first_score,
-                        "first_minute": first_min,
-                        "second_minute": second_min,
-                        "reliability": combined_reliability,
-                        "notified_at": now.isoformat()
-                    }
-                    del active_matches[match_id]
-                    deadlist.add(match_id)  # Aggiungi a deadlist perché già notificata
-                    # Entrambi i minuti sono esatti perché rilevati al momento (0-0 → 1-0/0-1 e 1-0/0-1 → 1-1)
-                    now_utc = datetime.utcnow().isoformat() + "Z"
-                    print(f"[{now_utc}] ✅ Notifica inviata: {home} - {away} ({first_score} al {first_min}' [ESATTO] → 1-1 al {second_min}' [ESATTO]) - {elapsed_game_minutes:.1f} min di gioco (stessa metà tempo, attendibilità {combined_reliability}/5)")
-                    sys.stdout.flush()
-                else:
-                    # Scaduta, rimuovi dal tracking e aggiungi a deadlist
-                    del active_matches[match_id]
-                    deadlist.add(match_id)  # Aggiungi a deadlist perché scaduta
-                    print(f"Partita scaduta (>{elapsed_game_minutes:.1f} min di gioco): {home} - {away}")
-        
-        # CASO 3: Partita tracciata che cambia punteggio in modo non interessante
-        elif match_id in active_matches:
-            match_data = active_matches[match_id]
-            # Se era 0-0 e ora non è più 0-0 e non è 1-0/0-1, rimuovila e aggiungi a deadlist
-            if match_data.get("score") == "0-0":
-                # Era 0-0, ora è cambiata ma non è 1-0/0-1 (es. 2-0, 0-2, 1-1, ecc.)
-                del active_matches[match_id]
-                # Se non è 1-1 (che viene gestito nel CASO 2), aggiungi a deadlist
-                if not (score_home == 1 and score_away == 1):
-                    deadlist.add(match_id)
-                now_utc = datetime.utcnow().isoformat() + "Z"
-                print(f"[{now_utc}] ⚠️ Partita rimossa dal tracking: {home} - {away} (era 0-0, ora {score_home}-{score_away})")
-                sys.stdout.flush()
-            # Se era 1-0/0-1 e ora non è più 1-0/0-1 e non è 1-1, rimuovila e aggiungi a deadlist
-            elif "first_score" in match_data:
-                # Era 1-0/0-1, ora è cambiata ma non è 1-1 (es. 2-0, 0-2, 2-1, ecc.)
-                del active_matches[match_id]
-                deadlist.add(match_id)  # Aggiungi a deadlist perché non può più diventare 1-1
-                print(f"Partita rimossa dal tracking (punteggio cambiato): {home} - {away} (era {match_data.get('first_score')}, ora {score_home}-{score_away})")
-    
-    # Log statistiche finali
-    processed_count = len(live_matches) - skipped_deadlist
-    now_utc = datetime.utcnow().isoformat() + "Z"
-    print(f"[{now_utc}] 📊 Statistiche ciclo: {len(live_matches)} partite ottenute, {processed_count} processate, {skipped_deadlist} saltate (deadlist)")
-    sys.stdout.flush()
-    
-    # Aggiorna risultati salvati e persisti stato
-    update_results_for_sent_matches(sent_matches, current_matches_dict)
-    save_active_matches(active_matches)
-    save_sent_matches(sent_matches)
-    save_deadlist(deadlist)  # Salva deadlist
+            # Smista in base al punteggio attuale
+            match (match.score_home, match.score_away):
+                case (0, 0):
+                    _track_scoreless(match, match_id, active_matches, batch)
+                case (1, 0) | (0, 1):
+                    _track_first_goal(match, match_id, active_matches, batch, now)
+                case (1, 1):
+                    _check_equalizer(match, match_id, active_matches, sent_matches, batch, now)
+                case _:
+                    if match_id in active_matches:
+                        _untrack_changed_score(match, match_id, active_matches, batch)
+    
+        # Invia le notifiche 1-1 rilevate in questo ciclo
+        send_notifications(batch, active_matches, sent_matches)
+    
+        # Log statistiche finali
+        processed_count = len(live_matches) - skipped_deadlist
+        log.info("📊 Statistiche ciclo: %s partite ottenute, %s processate, %s saltate (deadlist)", len(live_matches), processed_count, skipped_deadlist)
+    
+        # Aggiorna risultati salvati e persisti stato
+        # (il salvataggio su file avviene una sola volta all'uscita dal batch)
+        updated_ids = update_results_for_sent_matches(sent_matches, current_matches_dict)
+        batch.dirty_sent.update(updated_ids)
+        batch.dirty_sent.update(prune_sent_matches(sent_matches, now.timestamp()))
 
 
 # ---------- STATO RUNTIME PER COMANDI ----------
-from collections import defaultdict
-
 last_check_started_at = None
 last_check_finished_at = None
 last_check_error = None
 total_notifications_sent = 0
-daily_notifications = defaultdict(int)
+# Ultimi 30 giorni con notifiche: [date.toordinal(), conteggio], in ordine di data (memoria limitata)
+daily_notifications = deque(maxlen=30)
+
+
+def _daily_counts():
+    """Copia {date.toordinal(): notifiche} dei giorni recenti, presa sotto lock: il loop di polling aggiorna il deque mentre i comandi lo leggono da altri thread"""
+    with _stats_lock:
+        return dict(daily_notifications)
 
 
 # ---------- COMANDI TELEGRAM ----------
+def iter_telegram_chunks(lines, limit=4000):
+    """Raggruppa le righe in messaggi da al massimo limit caratteri (limite Telegram 4096)"""
+    buf = []
+    cur_len = 0
+    for line in lines:
+        line_len = len(line) + 1  # +1 per newline
+        if buf and cur_len + line_len > limit:
+            yield "\n".join(buf)
+            buf = []
+            cur_len = 0
+        buf.append(line)
+        cur_len += line_len
+    if buf:
+        yield "\n".join(buf)
+
+
+# Telegram accetta circa 1 messaggio al secondo per chat: oltre risponde 429
+TELEGRAM_CHAT_MIN_INTERVAL = 1.1  # Secondi
+# Ultimo slot di invio prenotato (time.monotonic) per chat_id
+_last_chat_send = {}
+# Protegge _last_chat_send: inviano sia il loop di polling sia i worker run_async
+_chat_send_lock = Lock()
+
+
+def _wait_chat_slot(chat_id, min_interval=TELEGRAM_CHAT_MIN_INTERVAL):
+    """
+    Prenota sotto lock il prossimo slot di invio per la chat (almeno min_interval dopo il precedente)
+    e attende fuori dal lock il suo inizio: invii concorrenti alla stessa chat vengono distanziati.
+    """
+    with _chat_send_lock:
+        now = time.monotonic()
+        slot = max(now, _last_chat_send.get(chat_id, 0.0) + min_interval)
+        _last_chat_send[chat_id] = slot
+    if slot > now:
+        time.sleep(slot - now)
+
+
+def send_paced(message, chunks, min_interval=TELEGRAM_CHAT_MIN_INTERVAL):
+    """Invia i chunk come risposte a message distanziandoli di almeno min_interval per chat"""
+    chat_id = message.chat_id
+    for chunk in chunks:
+        _wait_chat_slot(chat_id, min_interval)
+        message.reply_text(chunk)
+
+
 def cmd_start(update, context):
     """Messaggio di benvenuto"""
     welcome_text = (
@@ -1311,13 +1812,10 @@ def cmd_status(update, context):
     else:
         lines.append("✅ Nessun errore")
     
-    # Carica partite attive
-    active_matches = load_active_matches()
-    lines.append(f"Partite in tracking: {len(active_matches)}")
+    lines.append(f"Partite in tracking: {len(_active_matches)}")
     
     # Statistiche giornaliere
-    today = datetime.now().strftime("%Y-%m-%d")
-    lines.append(f"Notifiche oggi: {daily_notifications.get(today, 0)}")
+    lines.append(f"Notifiche oggi: {_daily_counts().get(date.today().toordinal(), 0)}")
     lines.append(f"Totale notifiche: {total_notifications_sent}")
     
     update.effective_message.reply_text("\n".join(lines))
@@ -1327,17 +1825,14 @@ def cmd_live(update, context):
     """Mostra partite live attualmente monitorate"""
     try:
         # Esegui uno scraping veloce
-        matches = scrape_sofascore()
+        matches, _ = cached_scrape()
         
         if not matches:
             update.effective_message.reply_text("Nessuna partita live al momento.")
             return
         
         # Filtra solo partite 1-0, 0-1, o 1-1
-        relevant = [m for m in matches if 
-                   (m["score_home"] == 1 and m["score_away"] == 0) or
-                   (m["score_home"] == 0 and m["score_away"] == 1) or
-                   (m["score_home"] == 1 and m["score_away"] == 1)]
+        relevant = [m for m in matches if (m.score_home, m.score_away) in RELEVANT_SCORES]
         
         if not relevant:
             update.effective_message.reply_text(f"Trovate {len(matches)} partite live, nessuna in stato 1-0/0-1/1-1.")
@@ -1345,10 +1840,10 @@ def cmd_live(update, context):
         
         lines = [f"📊 Partite live rilevanti: {len(relevant)}"]
         for m in relevant[:20]:  # Limita a 20 per non superare limiti Telegram
-            minute_str = f" {m['minute']}'" if m.get('minute') is not None else " N/A'"
-            reliability = m.get('reliability', 0)
-            reliability_emoji = ["❌", "⚠️", "⚠️", "✅", "✅", "✅✅"][min(reliability, 5)]
-            lines.append(f"• {m['home']} - {m['away']} {m['score_home']}-{m['score_away']}{minute_str} {reliability_emoji} ({m['league']})")
+            minute = m.minute
+            minute_str = f" {minute}'" if minute is not None else " N/A'"
+            reliability_emoji = RELIABILITY_EMOJI[min(m.reliability, 5)]
+            lines.append(f"• {m.home} - {m.away} {m.score_home}-{m.score_away}{minute_str} {reliability_emoji} ({m.league})")
         
         if len(relevant) > 20:
             lines.append(f"... e altre {len(relevant) - 20} partite")
@@ -1358,111 +1853,79 @@ def cmd_live(update, context):
         update.effective_message.reply_text(f"Errore nel recupero partite: {e}")
 
 
+def _all_games_lines(matches):
+    """Genera le righe di /see_all_games (consumate man mano da iter_telegram_chunks)"""
+    yield f"⚽ Tutte le partite trovate: {len(matches)}"
+    yield ""
+
+    # Mostra tutte le partite (senza filtri, incluso 0-0)
+    for i, m in enumerate(matches, 1):
+        minute = m.minute
+        country = m.country
+        minute_str = f" {minute}'" if minute is not None else " N/A'"
+        reliability_emoji = RELIABILITY_EMOJI[min(m.reliability, 5)]
+        country_str = f" ({country})" if country and country != "Unknown" else ""
+        yield f"{i}. {m.home} - {m.away} {m.score_home}-{m.score_away}{minute_str} {reliability_emoji}"
+        yield f"   {m.league}{country_str}"
+        yield ""
+
+        # Limita a 50 partite per non superare i limiti di Telegram (4096 caratteri)
+        if i >= 50:
+            yield f"... e altre {len(matches) - 50} partite"
+            break
+
+
 def cmd_see_all_games(update, context):
     """Mostra TUTTE le partite trovate dallo scraper"""
     try:
-        # Esegui scraping
-        update.effective_message.reply_text("🔍 Scraping in corso...")
-        matches = scrape_sofascore()
+        # Esegui scraping (anche l'avviso passa dal pacing: seguono altre risposte nella stessa chat)
+        send_paced(update.effective_message, ["🔍 Scraping in corso..."])
+        matches, _ = cached_scrape()
         
         if not matches:
-            update.effective_message.reply_text("Nessuna partita trovata al momento.")
+            send_paced(update.effective_message, ["Nessuna partita trovata al momento."])
             return
         
-        lines = [f"⚽ Tutte le partite trovate: {len(matches)}"]
-        lines.append("")
-        
-        # Mostra tutte le partite (senza filtri, incluso 0-0)
-        for i, m in enumerate(matches, 1):
-            minute_str = f" {m['minute']}'" if m.get('minute') is not None else " N/A'"
-            reliability = m.get('reliability', 0)
-            reliability_emoji = ["❌", "⚠️", "⚠️", "✅", "✅", "✅✅"][min(reliability, 5)]
-            country = f" ({m['country']})" if m.get('country') and m['country'] != "Unknown" else ""
-            lines.append(f"{i}. {m['home']} - {m['away']} {m['score_home']}-{m['score_away']}{minute_str} {reliability_emoji}")
-            lines.append(f"   {m['league']}{country}")
-            lines.append("")
-            
-            # Limita a 50 partite per non superare i limiti di Telegram (4096 caratteri)
-            if i >= 50:
-                lines.append(f"... e altre {len(matches) - 50} partite")
-                break
-        
-        # Se il messaggio è troppo lungo, dividilo in più messaggi
-        text = "\n".join(lines)
-        if len(text) > 4000:
-            # Dividi in chunk
-            chunks = []
-            current_chunk = [lines[0], lines[1], ""]  # Header
-            current_length = len("\n".join(current_chunk))
-            
-            for line in lines[2:]:
-                line_len = len(line) + 1  # +1 per newline
-                if current_length + line_len > 4000:
-                    chunks.append("\n".join(current_chunk))
-                    current_chunk = [line]
-                    current_length = line_len
-                else:
-                    current_chunk.append(line)
-                    current_length += line_len
-            
-            if current_chunk:
-                chunks.append("\n".join(current_chunk))
-            
-            # Invia primo chunk
-            update.effective_message.reply_text(chunks[0])
-            # Invia altri chunk se presenti
-            for chunk in chunks[1:]:
-                update.effective_message.reply_text(chunk)
-        else:
-            update.effective_message.reply_text(text)
+        # Se il messaggio è troppo lungo, viene diviso in più messaggi
+        send_paced(update.effective_message, iter_telegram_chunks(_all_games_lines(matches)))
             
     except Exception as e:
-        update.effective_message.reply_text(f"Errore nel recupero partite: {e}")
+        send_paced(update.effective_message, [f"Errore nel recupero partite: {e}"])
 
 
 def cmd_active(update, context):
     """Mostra partite attualmente in tracking (1-0/0-1)"""
-    active_matches = load_active_matches()
+    active_matches = dict(_active_matches)
     
     if not active_matches:
         update.effective_message.reply_text("Nessuna partita in tracking al momento.")
         return
     
-    # Filtra solo quelle in 1-0 o 0-1
-    filtered = {}
-    for match_id, match_data in active_matches.items():
-        first_score = match_data.get("first_score", "")
-        if first_score in ["1-0", "0-1"]:
-            filtered[match_id] = match_data
+    # Filtra solo quelle in 1-0 o 0-1 (generatore: servono solo le prime 15 righe)
+    filtered = ((match_id, match_data) for match_id, match_data in active_matches.items()
+                if match_data.first_score in ("1-0", "0-1"))
+    total = sum(1 for match_data in active_matches.values() if match_data.first_score in ("1-0", "0-1"))
     
-    if not filtered:
+    if not total:
         update.effective_message.reply_text("Nessuna partita in tracking (1-0/0-1) al momento.")
         return
     
-    lines = [f"📋 Partite in tracking (1-0/0-1): {len(filtered)}"]
-    now = datetime.now()
+    lines = [f"📋 Partite in tracking (1-0/0-1): {total}"]
+    now_ts = time.time()
     
     # Ottieni partite live per mostrare minuto attuale
     try:
-        live_matches = scrape_sofascore()
-        live_dict = {get_match_id(m["home"], m["away"], m["league"]): m for m in live_matches}
+        _, live_dict = cached_scrape()
     except:
         live_dict = {}
     
-    for match_id, match_data in list(filtered.items())[:15]:  # Limita a 15
-        first_goal_time = match_data.get("first_goal_time")
-        if not first_goal_time:
-            # Se non c'è first_goal_time, salta questa partita (probabilmente è ancora 0-0)
+    for match_id, match_data in islice(filtered, 15):  # Limita a 15
+        first_goal_time_ts = match_data.first_goal_time_ts
+        if not first_goal_time_ts:
+            # Se non c'è first_goal_time_ts, salta questa partita (probabilmente è ancora 0-0)
             continue
         
-        # Converti stringa ISO in datetime se necessario
-        if isinstance(first_goal_time, str):
-            try:
-                first_goal_time = datetime.fromisoformat(first_goal_time)
-            except:
-                continue
-        
-        elapsed_minutes = (now - first_goal_time).total_seconds() / 60
+        elapsed_minutes = (now_ts - first_goal_time_ts) / 60
         remaining = max(0, 10 - elapsed_minutes)
         
         # Mostra minuto attuale se disponibile
@@ -1470,43 +1933,51 @@ def cmd_active(update, context):
         reliability_emoji = ""
         if match_id in live_dict:
             live_match = live_dict[match_id]
-            if live_match.get('minute') is not None:
-                current_minute = f"{live_match['minute']}'"
-                reliability = live_match.get('reliability', 0)
-                reliability_emoji = ["❌", "⚠️", "⚠️", "✅", "✅", "✅✅"][min(reliability, 5)]
+            if live_match.minute is not None:
+                current_minute = f"{live_match.minute}'"
+                reliability = live_match.reliability
+                reliability_emoji = RELIABILITY_EMOJI[min(reliability, 5)]
         
         lines.append(
-            f"• {match_data['home']} - {match_data['away']} "
-            f"({match_data['first_score']} al {match_data.get('first_goal_minute', 'N/A')}') - "
+            f"• {match_data.home} - {match_data.away} "
+            f"({match_data.first_score} al {match_data.first_goal_minute}') - "
             f"Minuto attuale: {current_minute} {reliability_emoji} - "
             f"{remaining:.1f} min rimanenti"
         )
     
-    if len(filtered) > 15:
-        lines.append(f"... e altre {len(filtered) - 15} partite")
+    if total > 15:
+        lines.append(f"... e altre {total - 15} partite")
     
     update.effective_message.reply_text("\n".join(lines)[:4000])
 
 
-def cmd_interested(update, context):
-    """Mostra partite che sono state notificate (reportate)"""
-    sent_matches = load_sent_matches()
-    
-    if not sent_matches:
-        update.effective_message.reply_text("Nessuna partita notificata finora.")
-        return
-    
-    lines = [f"📢 Partite notificate (reportate): {len(sent_matches)}"]
-    lines.append("")
+def _notified_ts(match_data):
+    """Epoch della notifica: usa notified_at_ts, con fallback sul vecchio campo ISO"""
+    notified_at_ts = match_data.get("notified_at_ts")
+    if notified_at_ts:
+        return notified_at_ts
+    notified_at = match_data.get("notified_at")
+    if notified_at:
+        try:
+            return datetime.fromisoformat(notified_at).timestamp()
+        except ValueError:
+            pass
+    return 0.0
+
+
+def _interested_lines(sent_matches):
+    """Genera le righe di /interested (consumate man mano da iter_telegram_chunks)"""
+    yield f"📢 Partite notificate (reportate): {len(sent_matches)}"
+    yield ""
     
-    # Ordina per data di notifica (più recenti prima)
-    sorted_matches = sorted(
-        sent_matches.items(),
-        key=lambda x: x[1].get("notified_at", ""),
-        reverse=True
-    )
+    # Ordina per data di notifica (più recenti prima): chiave calcolata una sola volta per partita
+    decorated = [
+        (_notified_ts(match_data) if isinstance(match_data, dict) else 0.0, match_id, match_data)
+        for match_id, match_data in sent_matches.items()
+    ]
+    decorated.sort(key=itemgetter(0), reverse=True)
     
-    for i, (match_id, match_data) in enumerate(sorted_matches[:20], 1):  # Limita a 20
+    for i, (notified_ts, match_id, match_data) in enumerate(decorated[:20], 1):  # Limita a 20
         if isinstance(match_data, dict) and match_data:
             home = match_data.get("home", "?")
             away = match_data.get("away", "?")
@@ -1515,71 +1986,50 @@ def cmd_interested(update, context):
             first_score = match_data.get("first_score", "?")
             first_min = match_data.get("first_minute", "?")
             second_min = match_data.get("second_minute", "?")
-            notified_at = match_data.get("notified_at", "")
             
             country_str = f" ({country})" if country and country != "Unknown" else ""
             reliability = match_data.get("reliability", 0)
-            reliability_emoji = ["❌", "⚠️", "⚠️", "✅", "✅", "✅✅"][min(reliability, 5)]
+            reliability_emoji = RELIABILITY_EMOJI[min(reliability, 5)]
             
-            lines.append(f"{i}. {home} - {away}")
-            lines.append(f"   {league}{country_str}")
-            lines.append(f"   {first_score} al {first_min}' → 1-1 al {second_min}'")
-            lines.append(f"   Attendibilità: {reliability}/5 {reliability_emoji}")
-            if notified_at:
-                try:
-                    dt = datetime.fromisoformat(notified_at)
-                    lines.append(f"   Notificata: {dt.strftime('%d/%m/%Y %H:%M')}")
-                except:
-                    pass
-            lines.append("")
+            yield f"{i}. {home} - {away}"
+            yield f"   {league}{country_str}"
+            yield f"   {first_score} al {first_min}' → 1-1 al {second_min}'"
+            yield f"   Attendibilità: {reliability}/5 {reliability_emoji}"
+            if notified_ts:
+                yield f"   Notificata: {datetime.fromtimestamp(notified_ts).strftime('%d/%m/%Y %H:%M')}"
+            yield ""
         else:
             # Vecchio formato (solo ID)
-            lines.append(f"{i}. {match_id}")
-            lines.append("")
+            yield f"{i}. {match_id}"
+            yield ""
     
     if len(sent_matches) > 20:
-        lines.append(f"... e altre {len(sent_matches) - 20} partite")
-    
-    # Se il messaggio è troppo lungo, dividilo
-    text = "\n".join(lines)
-    if len(text) > 4000:
-        # Dividi in chunk
-        chunks = []
-        current_chunk = [lines[0], lines[1], ""]
-        current_length = len("\n".join(current_chunk))
-        
-        for line in lines[2:]:
-            line_len = len(line) + 1
-            if current_length + line_len > 4000:
-                chunks.append("\n".join(current_chunk))
-                current_chunk = [line]
-                current_length = line_len
-            else:
-                current_chunk.append(line)
-                current_length += line_len
-        
-        if current_chunk:
-            chunks.append("\n".join(current_chunk))
-        
-        update.effective_message.reply_text(chunks[0])
-        for chunk in chunks[1:]:
-            update.effective_message.reply_text(chunk)
-    else:
-        update.effective_message.reply_text(text)
+        yield f"... e altre {len(sent_matches) - 20} partite"
+
+
+def cmd_interested(update, context):
+    """Mostra partite che sono state notificate (reportate)"""
+    sent_matches = dict(_sent_matches)
+    
+    if not sent_matches:
+        update.effective_message.reply_text("Nessuna partita notificata finora.")
+        return
+    
+    # Se il messaggio è troppo lungo, viene diviso in più messaggi
+    send_paced(update.effective_message, iter_telegram_chunks(_interested_lines(sent_matches)))
 
 
 def cmd_stats(update, context):
     """Mostra statistiche notifiche"""
-    today = datetime.now().date()
+    base = date.today().toordinal()
+    counts = _daily_counts()
     lines = ["📊 Statistiche notifiche (ultimi 7 giorni):"]
     
     total_week = 0
     for i in range(7):
-        d = today - timedelta(days=i)
-        date_str = d.strftime("%Y-%m-%d")
-        count = daily_notifications.get(date_str, 0)
+        count = counts.get(base - i, 0)
         total_week += count
-        day_name = d.strftime("%a %d/%m")
+        day_name = date.fromordinal(base - i).strftime("%a %d/%m")
         lines.append(f"• {day_name}: {count}")
     
     lines.append(f"\nTotale settimana: {total_week}")
@@ -1591,7 +2041,7 @@ def cmd_stats(update, context):
 def cmd_excel(update, context):
     """Genera e invia un file Excel con tutte le partite notificate"""
     try:
-        sent_matches = load_sent_matches()
+        sent_matches = dict(_sent_matches)
         if not sent_matches:
             update.effective_message.reply_text("Nessuna partita notificata finora.")
             return
@@ -1603,9 +2053,9 @@ def cmd_excel(update, context):
             update.effective_message.reply_text("Libreria openpyxl non disponibile sul server.")
             return
         
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Matches"
+        # Modalità write-only: le righe vengono serializzate man mano invece di restare in memoria come celle
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Matches")
         # Header
         ws.append([
             "home_team",
@@ -1661,40 +2111,66 @@ def cmd_excel(update, context):
             update.effective_message.reply_text(msg)
             return
         
-        # Salva su file temporaneo
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-            tmp_path = tmp.name
-        wb.save(tmp_path)
-        
-        # Invia file
-        with open(tmp_path, "rb") as f:
-            update.effective_message.reply_document(document=f, filename="matches.xlsx", caption="Excel generato")
+        # Salva in memoria e invia il file (nessun file temporaneo su disco)
+        buf = BytesIO()
+        wb.save(buf)
+        buf.seek(0)
+        update.effective_message.reply_document(document=buf, filename="matches.xlsx", caption="Excel generato")
         
         if missing_count:
             info_msg = f"{missing_count} partite sono ancora senza risultati completi."
             if missing_examples:
                 info_msg += " Esempi: " + ", ".join(missing_examples)
             update.effective_message.reply_text(info_msg)
-        
-        # Prova a rimuovere il file
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
     except Exception as e:
         update.effective_message.reply_text(f"Errore generazione Excel: {e}")
 
+
+# Comandi disponibili nei canali (i post dei canali non passano dai CommandHandler)
+CHANNEL_COMMANDS = {
+    "start": cmd_start,
+    "ping": cmd_ping,
+    "help": cmd_help,
+    "status": cmd_status,
+    "live": cmd_live,
+    "see_all_games": cmd_see_all_games,
+    "active": cmd_active,
+    "stats": cmd_stats,
+    "excel": cmd_excel,
+}
+
+
+def _is_conflict(value):
+    """True se value è un errore Conflict o un testo che lo riporta"""
+    return isinstance(value, Conflict) or (isinstance(value, str) and "Conflict" in value)
+
+
+class ConflictFilter(logging.Filter):
+    """
+    Filtra errori Conflict dal logging di python-telegram-bot.
+    Controlla msg, argomenti ed eccezione del record senza formattare il messaggio.
+    """
+    def filter(self, record):
+        if _is_conflict(record.msg):
+            return False
+        if isinstance(record.args, tuple) and any(_is_conflict(arg) for arg in record.args):
+            return False
+        if record.exc_info and isinstance(record.exc_info[1], Conflict):
+            return False
+        return True
+
+
 def setup_telegram_commands():
     """Configura e avvia Updater per comandi Telegram"""
     try:
         # Elimina webhook se presente
         try:
             bot.delete_webhook(drop_pending_updates=True)
-            print("✅ Webhook eliminato (se presente)")
+            log.info("✅ Webhook eliminato (se presente)")
         except Exception as e:
-            print(f"⚠️ Errore eliminazione webhook (probabilmente non presente): {e}")
+            log.warning("⚠️ Errore eliminazione webhook (probabilmente non presente): %s", e)
         
-        updater = Updater(token=TELEGRAM_TOKEN, use_context=True)
+        updater = Updater(bot=bot, use_context=True, workers=TELEGRAM_WORKERS)
         dp = updater.dispatcher
         
         # Configura logging per sopprimere errori Conflict
@@ -1703,13 +2179,7 @@ def setup_telegram_commands():
             level=logging.WARNING
         )
         
-        # Filtra errori Conflict dal logging di python-telegram-bot
-        class ConflictFilter(logging.Filter):
-            def filter(self, record):
-                msg = str(record.getMessage())
-                return "Conflict" not in msg and "conflict" not in msg.lower()
-        
-        # Applica filtro ai logger di telegram
+        # Applica filtro Conflict ai logger di telegram
         telegram_logger = logging.getLogger('telegram')
         telegram_logger.addFilter(ConflictFilter())
         updater_logger = logging.getLogger('telegram.ext.updater')
@@ -1727,22 +2197,24 @@ def setup_telegram_commands():
                 return
             else:
                 # Log altri errori
-                print(f"⚠️ Errore durante elaborazione update: {error}")
+                log.warning("⚠️ Errore durante elaborazione update: %s", error)
         
         dp.add_error_handler(error_handler)
         
         # Registra comandi
+        # I comandi che fanno scraping o inviano più messaggi girano nel pool di worker
+        # del dispatcher (run_async), così non bloccano /ping e gli altri comandi veloci
         dp.add_handler(CommandHandler("start", cmd_start))
         dp.add_handler(CommandHandler("ping", cmd_ping))
         dp.add_handler(CommandHandler("help", cmd_help))
         dp.add_handler(CommandHandler("status", cmd_status))
-        dp.add_handler(CommandHandler("live", cmd_live))
-        dp.add_handler(CommandHandler("see_all_games", cmd_see_all_games))
-        dp.add_handler(CommandHandler("active", cmd_active))
-        dp.add_handler(CommandHandler("interested", cmd_interested))
-        dp.add_handler(CommandHandler("reported", cmd_interested))  # Alias
+        dp.add_handler(CommandHandler("live", cmd_live, run_async=True))
+        dp.add_handler(CommandHandler("see_all_games", cmd_see_all_games, run_async=True))
+        dp.add_handler(CommandHandler("active", cmd_active, run_async=True))
+        dp.add_handler(CommandHandler("interested", cmd_interested, run_async=True))
+        dp.add_handler(CommandHandler("reported", cmd_interested, run_async=True))  # Alias
         dp.add_handler(CommandHandler("stats", cmd_stats))
-        dp.add_handler(CommandHandler("excel", cmd_excel))
+        dp.add_handler(CommandHandler("excel", cmd_excel, run_async=True))
         
         # Gestione comandi nei canali
         def handle_channel_command(update, context):
@@ -1758,71 +2230,51 @@ def setup_telegram_commands():
             args = parts[1:] if len(parts) > 1 else []
             
             # Mappa comandi
-            if cmd == "start":
-                cmd_start(update, context)
-            elif cmd == "ping":
-                cmd_ping(update, context)
-            elif cmd == "help":
-                cmd_help(update, context)
-            elif cmd == "status":
-                cmd_status(update, context)
-            elif cmd == "live":
-                cmd_live(update, context)
-            elif cmd == "see_all_games":
-                cmd_see_all_games(update, context)
-            elif cmd == "active":
-                cmd_active(update, context)
-            elif cmd == "stats":
-                cmd_stats(update, context)
-            elif cmd == "excel":
-                cmd_excel(update, context)
-        
-        dp.add_handler(MessageHandler(Filters.update.channel_posts, handle_channel_command))
+            handler = CHANNEL_COMMANDS.get(cmd)
+            if handler:
+                handler(update, context)
+        
+        dp.add_handler(MessageHandler(Filters.update.channel_posts, handle_channel_command, run_async=True))
         
         # Avvia polling con gestione errori silenziosa
         try:
             updater.start_polling(drop_pending_updates=True)
-            print("✅ Updater Telegram avviato - Comandi disponibili")
+            log.info("✅ Updater Telegram avviato - Comandi disponibili")
         except Conflict:
-            print("⚠️ Errore Conflict all'avvio (probabilmente più istanze in esecuzione)")
-            print("⚠️ Il bot continuerà a funzionare ma potrebbe non ricevere comandi")
+            log.warning("⚠️ Errore Conflict all'avvio (probabilmente più istanze in esecuzione): il bot continuerà a funzionare ma potrebbe non ricevere comandi")
         except Exception as e:
-            print(f"⚠️ Errore all'avvio polling: {e}")
+            log.warning("⚠️ Errore all'avvio polling: %s", e)
         
         return updater
     except Exception as e:
-        print(f"⚠️ Errore nell'avvio Updater: {e}")
+        log.warning("⚠️ Errore nell'avvio Updater: %s", e)
         return None
 
 
 class HealthCheckHandler(BaseHTTPRequestHandler):
     """Handler per HTTP server di keep-alive"""
-    def _send_health_response(self):
-        """Invia risposta di health check"""
+    HEALTH_PATHS = frozenset({"/", "/health"})
+    
+    def _send_health_headers(self):
+        """Invia status e header di health check (il body è aggiunto solo per GET)"""
+        if self.path not in self.HEALTH_PATHS:
+            self.send_response(404)
+            self.end_headers()
+            return False
         self.send_response(200)
         self.send_header('Content-type', 'text/plain')
         self.send_header('Content-Length', '2')
         self.end_headers()
-        self.wfile.write(b'OK')
+        return True
     
     def do_GET(self):
         """Gestisce richieste GET"""
-        if self.path == '/health' or self.path == '/':
-            self._send_health_response()
-        else:
-            self.send_response(404)
-            self.end_headers()
+        if self._send_health_headers():
+            self.wfile.write(b'OK')
     
     def do_HEAD(self):
         """Gestisce richieste HEAD (usate da Render e UptimeRobot)"""
-        if self.path == '/health' or self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/plain')
-            self.send_header('Content-Length', '2')
-            self.end_headers()
-        else:
-            self.send_response(404)
-            self.end_headers()
+        self._send_health_headers()
     
     def do_OPTIONS(self):
         """Gestisce richieste OPTIONS"""
@@ -1836,48 +2288,63 @@ class HealthCheckHandler(BaseHTTPRequestHandler):
 
 
 def start_http_server(port=8080):
-    """Avvia HTTP server per keep-alive (evita che Render si addormenti)"""
+    """
+    Avvia HTTP server per keep-alive (evita che Render si addormenti).
+    Le richieste sono servite in sequenza da un solo thread daemon: i probe sono
+    rari e brevissimi, non serve un thread per connessione.
+    """
     try:
         server = HTTPServer(('0.0.0.0', port), HealthCheckHandler)
-        Thread(target=server.serve_forever, daemon=True).start()
-        print(f"✅ HTTP server avviato su porta {port} (keep-alive)")
+        Thread(target=server.serve_forever, name="health-http", daemon=True).start()
+        log.info("✅ HTTP server avviato su porta %s (keep-alive)", port)
     except Exception as e:
-        print(f"⚠️ Errore avvio HTTP server: {e}")
+        log.warning("⚠️ Errore avvio HTTP server: %s", e)
 
 
 def main():
     """Loop principale: controlla partite ogni POLL_INTERVAL secondi"""
     global last_check_started_at, last_check_finished_at, last_check_error
     
-    print("Bot avviato. Monitoraggio partite live su SofaScore...")
-    sys.stdout.flush()
+    log.info("Bot avviato. Monitoraggio partite live su SofaScore...")
+    
+    # Carica i risultati definitivi già noti delle partite finite
+    _finished_results.update(load_finished_results())
+    # Stato di tracking tenuto in memoria per tutta la vita del processo
+    load_state()
+    atexit.register(save_state)
     
     # Avvia HTTP server per keep-alive (se PORT è definito, usa quello)
     port = int(os.getenv('PORT', 8080))
     start_http_server(port)
     
+    # Avvia il thread che aggiorna lo scraping condiviso con i comandi
+    Thread(target=_scrape_refresh_loop, name="scrape-refresh", daemon=True).start()
+    
     # Avvia Updater per comandi Telegram in background
     updater = setup_telegram_commands()
     
+    # Cadenza fissa: i cicli partono ogni POLL_INTERVAL secondi (orologio monotonic),
+    # la durata di process_matches non si somma all'attesa
+    next_cycle_at = time.monotonic()
     while True:
         try:
             last_check_started_at = datetime.now()
-            cycle_start_utc = datetime.utcnow().isoformat() + "Z"
-            print(f"[${cycle_start_utc}] ▶️ Inizio ciclo controllo partite")
-            sys.stdout.flush()
+            log.info("▶️ Inizio ciclo controllo partite")
             last_check_error = None
             process_matches()
             last_check_finished_at = datetime.now()
-            cycle_end_utc = datetime.utcnow().isoformat() + "Z"
-            print(f"[${cycle_end_utc}] ⏹️ Fine ciclo controllo partite")
-            sys.stdout.flush()
+            log.info("⏹️ Fine ciclo controllo partite")
         except Exception as e:
             last_check_error = str(e)
-            print(f"Errore: {e}")
-            sys.stdout.flush()
-        print(f"Attesa {POLL_INTERVAL} secondi prima del prossimo controllo...")
-        sys.stdout.flush()
-        time.sleep(POLL_INTERVAL)
+            log.error("❌ Errore: %s", e)
+        next_cycle_at += POLL_INTERVAL
+        delay = next_cycle_at - time.monotonic()
+        if delay <= 0:
+            # Ciclo più lungo dell'intervallo: riparti subito senza accumulare ritardo
+            next_cycle_at = time.monotonic()
+            delay = 0
+        log.info("Attesa %.1f secondi prima del prossimo controllo...", delay)
+        time.sleep(delay)
 
 
 if __name__ == "__main__":